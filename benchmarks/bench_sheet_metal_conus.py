@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Benchmark suite for the Sheet Metal Conus extension.
+
+    Times calculateCone, the path construction (build_arc, build_line and
+    build_cone_path), beVerbose and the complete effect() with and without
+    verbose markup against synthetic in-memory SVG documents of several page
+    sizes and units, and with a growing number of existing elements and
+    markers, to see how the effect scales with the document it is run on.
+    For every case the throughput (calls per second, best of several rounds)
+    and the peak memory of one call (measured separately with tracemalloc) are
+    recorded.
+
+    With --save the results are stored as baseline (merged into an existing
+    baseline, so saving a filtered run only replaces the cases that ran), later
+    runs compare against it and exit with status 1 if a case got slower or needs
+    more memory than the baseline plus the allowed tolerance, or if a case fails.
+
+    Example:
+        python3 benchmarks/bench_sheet_metal_conus.py --save
+        python3 benchmarks/bench_sheet_metal_conus.py -k effect --tolerance 0.2
+"""
+
+import argparse
+import fnmatch
+import gc
+import io
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sheet_metal_conus_geometry import build_arc, build_line, build_cone_path, calculate_cone
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# (name, diaBase, diaCut, heightCone)
+PARAMETER_SETS = [('cone',    300.0,   0.0,  200.0),
+                  ('frustum', 300.0, 100.0,  200.0),
+                  ('flat',    500.0, 480.0,    5.0),
+                  ('steep',    50.0,  40.0, 2000.0),
+                  ('tiny',      2.0,   1.0,    1.5),
+                  ('large',  8000.0, 2500.0, 6000.0)]
+
+# (name, width, height, unit, viewBox width, viewBox height, elements, markers) of the synthetic documents
+DOCUMENTS = [('a4-mm',     210,  297, 'mm',  210,   297,        0,   0),
+             ('a4-px',     210,  297, 'mm',  793.7, 1122.5,     0,   0),
+             ('sheet-in',  120,   60, 'in',  120,    60,        0,   0),
+             ('a0-mm-1k',  841, 1189, 'mm',  841,  1189,     1000,  20),
+             ('a0-mm-10k', 841, 1189, 'mm',  841,  1189,    10000, 200)]
+
+SVG_TEMPLATE = '<svg xmlns="http://www.w3.org/2000/svg" ' \
+               'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" ' \
+               'xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd" ' \
+               'width="%s%s" height="%s%s" viewBox="0 0 %s %s">' \
+               '<sodipodi:namedview id="namedview1" inkscape:document-units="%s"/>' \
+               '<defs id="defs1">%s</defs>' \
+               '<g id="layer1" inkscape:label="Layer 1" inkscape:groupmode="layer">%s</g></svg>'
+
+MARKER_TEMPLATE = '<marker id="marker%d" orient="auto" refX="0" refY="0" style="overflow:visible">' \
+                  '<path d="M 0,0 L 5,2 L 0,4 z" style="fill:#000000;stroke:none"/></marker>'
+
+def synthetic_elements(count, markers, viewWidth, viewHeight):
+    """ Markup of count existing drawing elements, every tenth one a text and every
+        other path ending in one of the markers, spread over groups of 100 elements
+    """
+    out = []
+    for index in range(count):
+        if index % 100 == 0:
+            out.append('%s<g id="group%d">' % ('</g>' if index else '', index))
+        x = (index * 7.3) % viewWidth
+        y = (index * 3.1) % viewHeight
+        if index % 10 == 9:
+            out.append('<text id="text%d" x="%.1f" y="%.1f" style="font-size:4px">Part %d</text>' % (index, x, y, index))
+            continue
+        marker = ';marker-end:url(#marker%d)' % (index % markers) if markers and index % 2 else ''
+        out.append('<path id="path%d" d="M %.1f,%.1f l 10,0 0,10 -10,0 z" style="fill:none;stroke:#000000;stroke-width:0.3%s"/>'
+                   % (index, x, y, marker))
+    if count:
+        out.append('</g>')
+    return ''.join(out)
+
+def synthetic_document(width, height, unit, viewWidth, viewHeight, elements=0, markers=0):
+    " SVG document of the given size with elements existing drawing elements and markers in defs, as bytes "
+    defs = ''.join(MARKER_TEMPLATE % index for index in range(markers))
+    return (SVG_TEMPLATE % (width, unit, height, unit, viewWidth, viewHeight, unit, defs,
+                            synthetic_elements(elements, markers, viewWidth, viewHeight))).encode('utf-8')
+
+def effect_args(diaBase, diaCut, heightCone, verbose):
+    return ['--diaBase=%s' % diaBase, '--diaCut=%s' % diaCut, '--heightCone=%s' % heightCone,
+            '--verbose=%s' % verbose]
+
+# Cases, every case is a function returning the callable that is timed
+def case_calculate_cone(diaBase, diaCut, heightCone):
+    def run():
+        calculate_cone({'diaBase': diaBase, 'diaCut': diaCut, 'heightCone': heightCone})
+    return run
+
+def case_build_path(diaBase, diaCut, heightCone):
+    dictCone = {'diaBase': diaBase, 'diaCut': diaCut, 'heightCone': heightCone}
+    calculate_cone(dictCone)
+    convFactor = 96.0/25.4
+    def run():
+        build_cone_path(dictCone, convFactor)
+        build_arc(0, 0, 0, math.degrees(dictCone['angle']), dictCone['longRadius']*convFactor)
+        build_line(*dictCone['ptA'], *dictCone['ptB'], convFactor)
+    return run
+
+def case_effect(document, args):
+    " The complete extension run from loading to saving the document, in memory "
+    from sheet_metal_conus import SheetMetalConus
+    def run():
+        effect = SheetMetalConus()
+        effect.parse_arguments(args)
+        effect.options.input_file = io.BytesIO(document)
+        effect.options.output = io.BytesIO()
+        effect.load_raw()
+        effect.save_raw(effect.effect())
+    return run
+
+def case_be_verbose(document, args):
+    " Only the dimensioning markup, drawn into a fresh group of a loaded document "
+    from lxml import etree
+    from sheet_metal_conus import SheetMetalConus
+    effect = SheetMetalConus()
+    effect.parse_arguments(args)
+    effect.document = effect.load(io.BytesIO(document))
+    dictCone = {'diaBase': effect.options.diaBase, 'diaCut': effect.options.diaCut,
+                'heightCone': effect.options.heightCone}
+    effect.calculateCone(dictCone)
+    convFactor = effect.svg.unittouu('1' + effect.options.units)
+    layer = effect.svg.get_current_layer()
+    def run():
+        group = etree.SubElement(layer, 'g')
+        effect.beVerbose(dictCone, convFactor, group)
+        layer.remove(group)
+    return run
+
+def collect_cases():
+    " (name, factory) of all cases, factories are called lazily so failing setups are reported per case "
+    cases = []
+    for name, diaBase, diaCut, heightCone in PARAMETER_SETS:
+        cases.append(('calculateCone/%s' % name, lambda p=(diaBase, diaCut, heightCone): case_calculate_cone(*p)))
+        cases.append(('build_path/%s' % name, lambda p=(diaBase, diaCut, heightCone): case_build_path(*p)))
+    for docName, width, height, unit, viewWidth, viewHeight, elements, markers in DOCUMENTS:
+        document = synthetic_document(width, height, unit, viewWidth, viewHeight, elements, markers)
+        for name, diaBase, diaCut, heightCone in PARAMETER_SETS:
+            for verbose in (False, True):
+                args = effect_args(diaBase, diaCut, heightCone, verbose)
+                label = '%s/%s%s' % (docName, name, '/verbose' if verbose else '')
+                cases.append(('effect/' + label, lambda d=document, a=args: case_effect(d, a)))
+            args = effect_args(diaBase, diaCut, heightCone, True)
+            cases.append(('beVerbose/%s/%s' % (docName, name), lambda d=document, a=args: case_be_verbose(d, a)))
+    return cases
+
+# Measuring
+def measure(run, minTime, rounds):
+    """ Throughput in calls per second (best of rounds) and peak memory of one call in bytes.
+        Every round repeats run() until it took at least minTime seconds.
+    """
+    run() # warm up, imports and caches
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= minTime:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(minTime / elapsed) + 1))
+    best = elapsed / number
+    for _ in range(rounds - 1):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'opsPerSec': 1.0 / best if best > 0 else float('inf'), 'peakBytes': peak}
+
+def compare(name, result, baseline, tolerance, memTolerance):
+    " List of regression messages for one case "
+    messages = []
+    if name not in baseline:
+        return messages
+    old = baseline[name]
+    if result['opsPerSec'] < old['opsPerSec'] / (1.0 + tolerance):
+        messages.append('%s: %.1f calls/s, baseline %.1f calls/s' % (name, result['opsPerSec'], old['opsPerSec']))
+    if result['peakBytes'] > old['peakBytes'] * (1.0 + memTolerance) + 1024:
+        messages.append('%s: peak memory %d bytes, baseline %d bytes' % (name, result['peakBytes'], old['peakBytes']))
+    return messages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Sheet Metal Conus extension and compare against stored baselines.')
+    parser.add_argument('-k', '--filter', action='append', metavar='PATTERN', help='Only run cases matching this glob pattern (e.g. "effect/*verbose"), may be repeated.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline file to compare against (default %(default)s).')
+    parser.add_argument('--save', action='store_true', help='Store the results in the baseline instead of comparing, cases that did not run keep their baseline.')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results to this JSON file.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed loss of throughput before a case counts as regression (0.25 = 25%%).')
+    parser.add_argument('--mem-tolerance', type=float, default=0.10, help='Allowed growth of peak memory before a case counts as regression.')
+    parser.add_argument('--min-time', type=float, default=0.05, help='Minimum duration of one timing round in seconds.')
+    parser.add_argument('--rounds', type=int, default=5, help='Number of timing rounds, the best one counts.')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    cases = collect_cases()
+    results = {}
+    failures = []
+    for name, factory in cases:
+        if args.filter and not any(fnmatch.fnmatchcase(name, pattern) for pattern in args.filter):
+            continue
+        try:
+            result = measure(factory(), args.min_time, max(1, args.rounds))
+        except Exception as error:
+            failures.append('%s: failed with %s: %s' % (name, type(error).__name__, error))
+            print('%-40s %14s' % (name, 'FAILED'))
+            continue
+        results[name] = result
+        print('%-40s %10.1f/s %10.1f KiB' % (name, result['opsPerSec'], result['peakBytes'] / 1024.0))
+        if not args.save:
+            failures.extend(compare(name, result, baseline, args.tolerance, args.mem_tolerance))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.save:
+        # merge into the stored baseline, dropping cases that no longer exist
+        names = set(name for name, factory in cases)
+        merged = {name: result for name, result in baseline.items() if name in names}
+        merged.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(merged, f, indent=1, sort_keys=True)
+        print('%d cases written to baseline %s (%d in total)' % (len(results), args.baseline, len(merged)))
+    elif not baseline:
+        print('No baseline found at %s, run with --save to create one.' % args.baseline)
+    for message in failures:
+        sys.stderr.write(message + '\n')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,44 +2,100 @@
 
 # Distributed under the terms of the GNU Lesser General Public License v3.0
 
+import hashlib
+import json
 import math
-import inkex
+import re
 from copy import deepcopy
+import inkex
 from lxml import etree
 from inkex.transforms import Transform
 from inkex import Color
+from sheet_metal_conus_geometry import (calc_angle_between_points, calc_dist_between_points,
+                                        normalize, point_on_circle, calculate_cone,
+                                        build_cone_path, build_arc, build_line,
+                                        calculate_gore_count, gore_cone, build_gore_path,
+                                        path_precision, calculate_oblique_cone, build_oblique_path,
+                                        bend_lines, build_bend_path)
+from sheet_metal_conus_chain import parse_stations, solve_chain, layout_chain, section_label, build_shape_path
+from sheet_metal_conus_cache import ConeCache, cache_key, default_cache_dir
+from sheet_metal_conus_profile import Profiler, write_report
+
+# caches by directory, kept for the lifetime of the process so further runs in it
+# (like the requests of a threaded daemon) hit the memory layer
+_caches = {}
 
-# Helper functions
-def calc_angle_between_points(p1, p2):
-    xDiff = p2[0] - p1[0]
-    yDiff = p2[1] - p1[1]
-    return math.degrees(math.atan2(yDiff, xDiff))
-	
-def calc_dist_between_points(p1, p2):
-    xDiff = p2[0] - p1[0]
-    yDiff = p2[1] - p1[1]
-    return math.sqrt(yDiff*yDiff + xDiff*xDiff)
-	
-def normalize(p1, p2):
-    " p1,p2 defines a vector return normalized "
-    xDiff = p2[0] - p1[0]
-    yDiff = p2[1] - p1[1]
-    magn = calc_dist_between_points(p1,p2)
-    return (xDiff/magn, yDiff/magn)
-	
-def polar_to_cartesian(cx, cy, radius, angle_degrees):
-    " So we can make arcs in the 'A' svg syntax. "
-    angle_radians = math.radians(angle_degrees)
-    return [
-	          cx + (radius * math.cos(angle_radians)), 
-			  cy + (radius * math.sin(angle_radians))
-		    ]
-	
-def point_on_circle(radius, angle):
-    " return xy coord of the point at distance radius from origin at angle "
-    x = radius * math.cos(angle)
-    y = radius * math.sin(angle)
-    return [x, y]
+def sameStructure(old, new):
+    " True if both elements have the same tags in the same tree layout "
+    if old.tag != new.tag:
+        return False
+    return len(old) == len(new) and all(sameStructure(a, b) for a, b in zip(old, new))
+
+def copyChanges(old, new):
+    " Copy changed attributes and texts of new onto old (same structure), ids of old are kept "
+    for key, value in new.attrib.items():
+        if old.get(key) != value:
+            old.set(key, value)
+    for key in list(old.attrib.keys()):
+        if key not in new.attrib and key != 'id':
+            del old.attrib[key]
+    if old.text != new.text:
+        old.text = new.text
+    for a, b in zip(old, new):
+        copyChanges(a, b)
+
+class MarkupRegistry:
+    """ Defines the markers and styles of the dimension markup once per document.
+        Styles become CSS classes of one style element in defs. Class names are
+        derived from the style content, so running the effect again on the same
+        document reuses the existing rules and markers instead of adding new ones.
+    """
+    sheetId = 'SheetMetalConusStyles'
+
+    def __init__(self, svg):
+        self.svg = svg
+        self.classes = {}   # style key -> class name
+        self.css = {}       # class name -> declarations
+        self.sheet = None
+
+    def defs(self):
+        defs = self.svg.getElement('/svg:svg//svg:defs')
+        if defs == None:
+            defs = etree.SubElement(self.svg, inkex.addNS('defs','svg'))
+        return defs
+
+    def styleSheet(self):
+        " The style element of the markup, created if the document has none yet "
+        if self.sheet is None:
+            sheet = self.svg.getElementById(self.sheetId)
+            if sheet is None:
+                sheet = etree.SubElement(self.defs(), inkex.addNS('style','svg'), {'id': self.sheetId, 'type': 'text/css'})
+            # rules of former runs
+            for name, css in re.findall(r'\.(smc-[0-9a-f]+)\{([^}]*)\}', sheet.text or ''):
+                self.css[name] = css
+            self.sheet = sheet
+        return self.sheet
+
+    def addRule(self, name, css):
+        " Add the rule .name{css} unless it exists "
+        sheet = self.styleSheet()
+        if name not in self.css:
+            sheet.text = (sheet.text or '') + '.%s{%s}\n' % (name, css)
+            self.css[name] = css
+
+    def styleClass(self, style):
+        " Name of the CSS class for the style dictionary, entries set to None are left out "
+        key = tuple(sorted((name, str(value)) for name, value in style.items() if value is not None))
+        name = self.classes.get(key)
+        if name is None:
+            css = ';'.join('%s:%s' % item for item in key)
+            name = 'smc-' + hashlib.sha1(css.encode('utf-8')).hexdigest()[:8]
+            self.addRule(name, css)
+            self.classes[key] = name
+        return name
+
+    def hasMarker(self, name):
+        return self.svg.getElementById(name) is not None
 
 class SheetMetalConus(inkex.Effect):
     """ Program to unfold a frustum of a cone or a cone 
@@ -49,6 +105,7 @@ class SheetMetalConus(inkex.Effect):
     color_marker_dim = '#703cd6'    # purple
     color_marker_chords = '#9d2222' # red
     color_marker_base = '#36ba36'   # green
+    color_marker_bend = '#1f6fb4'   # blue
     # Arrowed lines
     dimline_style = {'stroke'        : '#000000',
                      'stroke-width'  : '0.75px',
@@ -61,18 +118,83 @@ class SheetMetalConus(inkex.Effect):
         self.arg_parser.add_argument('-b', '--diaBase', type = float, dest = 'diaBase', default = 300.0, help = 'The diameter of the cones base.')
         self.arg_parser.add_argument('-c', '--diaCut',  type = float, default = 100.0, help = 'The diameter of cones cut (0.0 if cone is not cut.')
         self.arg_parser.add_argument('-l', '--heightCone',  type = float, default = 200.0, help = 'The height of the (cut) cone.')
+        self.arg_parser.add_argument('--chain', default = '', help = 'Diameter profile of a chain of frusta as stations diameter@height, e.g. "300@0 250@200 150@350" (empty = single cone).')
+        self.arg_parser.add_argument('--offset', type = float, default = 0.0, help = 'Offset of the center of the cut (or of the apex) from the center of the base for oblique cones (0 = right cone).')
+        self.arg_parser.add_argument('--perimeterTolerance', type = float, default = 0.01, help = 'Oblique cones are developed with as many generatrices as needed to get the perimeter within this tolerance (in units).')
         self.arg_parser.add_argument('-u', '--units', default = 'mm', help = 'The units in which the cone values are given. mm or in for real objects')
         self.arg_parser.add_argument('-w', '--strokeWidth', type = float, default = 0.3, help = 'The line thickness in given unit. For laser cutting it should be rather small.')
         self.arg_parser.add_argument('-f', '--strokeColour', type=Color, default = 255, help = 'The line colour.')
+        self.arg_parser.add_argument('--sheetWidth', type = float, default = 0.0, help = 'Width of the stock sheet. If the layout does not fit, it is split into gores (0 = never split).')
+        self.arg_parser.add_argument('--sheetHeight', type = float, default = 0.0, help = 'Height of the stock sheet.')
+        self.arg_parser.add_argument('--seamAllowance', type = float, default = 0.0, help = 'Width of the seam allowance added to the radial edges of every gore.')
+        self.arg_parser.add_argument('--joggleTabs', type = int, default = 0, help = 'Number of joggle tabs on the second edge of every gore instead of a continuous seam allowance.')
+        self.arg_parser.add_argument('--bendLines', type = int, default = 0, help = 'Number of radial bend lines for press brake forming (0 = none).')
+        self.arg_parser.add_argument('--bendSpacing', default = 'even', choices = ['even', 'adaptive'], help = 'Bend lines evenly spaced along the base or with equal bend angles (adaptive, differs on oblique cones).')
+        self.arg_parser.add_argument('--bendNumbers', type = inkex.Boolean, default = False, help = 'Number the bend lines.')
+        self.arg_parser.add_argument('--flattenTolerance', type = float, default = 0.0, help = 'Replace the arcs by polylines deviating at most this much (in units) from the true arcs (0 = keep arcs).')
+        self.arg_parser.add_argument('--precision', type = int, default = -1, help = 'Decimal places of the path coordinates in user units (-1 = as fine as needed for the units).')
+        self.arg_parser.add_argument('--cache', type = inkex.Boolean, default = False, help = 'Reuse the layout of a cone drawn before with the same parameters.')
+        self.arg_parser.add_argument('--cacheDir', default = '', help = 'Directory of the layout cache (default: the user cache directory).')
+        self.arg_parser.add_argument('--profile', type = inkex.Boolean, default = False, help = 'Record wall time and allocations of every phase of the effect.')
+        self.arg_parser.add_argument('--profileFile', default = '', help = 'Append the profile as one JSON line to this file instead of embedding it as metadata into the drawing.')
         self.arg_parser.add_argument('-d', '--verbose', type = inkex.Boolean, default = False, help = 'Enable verbose output of calculated parameters. Used for debugging or is someone needs the calculated values.')
 
+        self.profiler = Profiler()
+
+    def parse_arguments(self, args):
+        inkex.Effect.parse_arguments(self, args)
+        self.profiler = Profiler(self.options.profile)
+
+    def load_raw(self):
+        with self.profiler.phase('load'):
+            inkex.Effect.load_raw(self)
+
+    def save_raw(self, ret):
+        with self.profiler.phase('save'):
+            inkex.Effect.save_raw(self, ret)
+        if self.profiler.enabled and self.options.profileFile:
+            write_report(self.options.profileFile, self.profileReport())
+
+    def clean_up(self):
+        " Stop the profiler also if the effect failed, inkex calls this at the end of every run "
+        self.profiler.stop()
+        inkex.Effect.clean_up(self)
+
+    # Instrumented helpers
+    def userUnits(self, value):
+        " Document user units of a value with unit, recorded as phase unittouu "
+        with self.profiler.phase('unittouu'):
+            return self.svg.unittouu(value)
+
+    def styleString(self, style):
+        " Serialized style attribute, recorded as phase style "
+        with self.profiler.phase('style'):
+            return str(inkex.Style(style))
+
+    def styleClass(self, style):
+        " CSS class of a markup style, recorded as phase style "
+        with self.profiler.phase('style'):
+            return self.markupRegistry().styleClass(style)
+
+    def markupRegistry(self):
+        " The registry of markers and markup styles of the current document "
+        if getattr(self, 'registry', None) is None or self.registry.svg is not self.svg:
+            self.registry = MarkupRegistry(self.svg)
+        return self.registry
+
+    def profileReport(self):
+        " Profile of this run together with the parameters of the cone "
+        return self.profiler.report(diaBase=self.options.diaBase, diaCut=self.options.diaCut,
+                                    heightCone=self.options.heightCone, units=self.options.units,
+                                    verbose=bool(self.options.verbose))
+
     # Marker arrows
     def makeMarkerstyle(self, name, rotate):
-        " Markers added to defs for reuse "
-        defs = self.svg.getElement('/svg:svg//svg:defs')
-        if defs == None:
-            defs = etree.SubElement(self.document.getroot(),inkex.addNS('defs','svg'))
-        marker = etree.SubElement(defs ,inkex.addNS('marker','svg'))
+        " Markers added to defs for reuse, only once per document "
+        registry = self.markupRegistry()
+        if registry.hasMarker(name):
+            return
+        marker = etree.SubElement(registry.defs(), inkex.addNS('marker','svg'))
         marker.set('id', name)
         marker.set('orient', 'auto')
         marker.set('refX', '0.0')
@@ -131,19 +253,19 @@ class SheetMetalConus(inkex.Effect):
             anglefac = -1
         #
         if gap == 0:
-            line_attribs = {'style' : str(inkex.Style(style)),
+            line_attribs = {'class' : self.styleClass(style),
                             'd'     : self.build_arc(center, start, angle*anglefac, radius, lowside) }
             ell = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs )
         else: # leave a gap for label
             gap_angle = math.degrees(math.sin(gap/radius))
-            startstyle = deepcopy(style)
+            startstyle = dict(style)
             startstyle['marker-start'] = None
-            line_attribs = {'style' : str(inkex.Style(startstyle)),
+            line_attribs = {'class' : self.styleClass(startstyle),
                             'd'     : self.build_arc(center, start, angle*anglefac/2-gap_angle/2*anglefac, radius, lowside) }
             ell = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs )
-            endstyle = deepcopy(style)
+            endstyle = dict(style)
             endstyle['marker-end'] = None
-            line_attribs = {'style' : str(inkex.Style(endstyle)),
+            line_attribs = {'class' : self.styleClass(endstyle),
                             'd'     : self.build_arc(center, angle/2*anglefac+gap_angle/2*anglefac, angle*anglefac, radius, lowside) }
             etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs )
         # return pos in center of gap (or arc)
@@ -158,7 +280,7 @@ class SheetMetalConus(inkex.Effect):
             self.set_arrow_dir('inside', style)
         else:
             self.set_arrow_dir('outside', style)
-        attribs = {'style' : str(inkex.Style(style))}
+        attribs = {'class' : self.styleClass(style)}
         # account for length change so arrows fit
         norm = normalize(a, b)
         dim_start_x = a[0] + self.arrowlen*norm[0]
@@ -170,107 +292,309 @@ class SheetMetalConus(inkex.Effect):
         dimline = etree.SubElement(parent, inkex.addNS('path', 'svg'), attribs)
         return dimline
     
-    def calculateCone(self, dictCone):
-        """ Calculates all relevant values in order to construct a cone.
-            These values are:
-            - short radius
-            - long radius
-            - angle of cone layout
-            - chord of base diameter
-            - chord of cut diameter
-            - coordinates of points A, B, C and D
-        """        
-        dBase = dictCone['diaBase']
-        dCut =  dictCone['diaCut']
-        hCone = dictCone['heightCone']
-        base = dBase - dCut
-        # radius from top of cone to cut
-        if dCut > 0:
-            shortRadius = math.sqrt( dCut*dCut/4 + (dCut*hCone)/base * (dCut*hCone)/base )
-        else:
-            shortRadius=0.0
-        dictCone['shortRadius'] = shortRadius
-        ## radius from top of cone to base of cone
-        longRadius=math.sqrt( dBase*dBase/4 + (dBase*hCone)/base * (dBase*hCone)/base )
-        dictCone['longRadius'] = longRadius
-
-        ## angle of circle sector
-        angle=(math.pi * dBase) / longRadius
-        dictCone['angle'] = angle
-        # chord is the straight line between the 2 endpoints of an arc. 
-        # Not used directly, but available in verbose output.
-        chordBase = longRadius * math.sqrt( 2* (1-math.cos(angle)) )
-        dictCone['chordBase'] = chordBase
-        chordCut = shortRadius * math.sqrt( 2* (1-math.cos(angle)) )
-        dictCone['chordCut'] = chordCut
-
-        # calculate coordinates of points A, B, C and D
-        # center M is at (0,0) and points A and B are on the x-axis:
-        ptA = (shortRadius, 0.0)
-        ptB = (longRadius,  0.0)
-        # we can calculate points C and D with the given radii and the calculated angle
-        ptC=(longRadius * math.cos(angle),  longRadius *  math.sin(angle))
-        ptD=(shortRadius * math.cos(angle), shortRadius * math.sin(angle))
-        dictCone['ptA'] = ptA
-        dictCone['ptB'] = ptB
-        dictCone['ptC'] = ptC
-        dictCone['ptD'] = ptD
+    # the geometry lives in sheet_metal_conus_geometry so it can be used without inkex
+    calculateCone = staticmethod(calculate_cone)
 
     def effect(self):
         """ Effect behaviour.
             - Overrides base class' method and draws rolled out sheet metal cone into SVG document.
         """
+        with self.profiler.phase('effect'):
+            grp = self.drawLayout()
+        if self.profiler.enabled and not self.options.profileFile:
+            # embed the profile, save is not part of it as it happens afterwards
+            for old in grp.findall(inkex.addNS('metadata','svg')):
+                grp.remove(old)
+            profile = etree.SubElement(grp, inkex.addNS('metadata','svg'), {inkex.addNS('label','inkscape'): 'profile'})
+            profile.text = json.dumps(self.profileReport(), sort_keys=True)
+
+    def drawLayout(self):
+        """ Draw the cone layout into a new group of the current layer, or update a
+            selected group drawn by an earlier run in place, and return the group.
+        """
         # calc scene scale
-        convFactor = self.svg.unittouu("1" + self.options.units)   
+        convFactor = self.userUnits("1" + self.options.units)   
         # Store all the relevants values in a dictionary for easy access
         dictCone={'diaBase':    self.options.diaBase,
                   'diaCut':     self.options.diaCut,
                   'heightCone': self.options.heightCone }
-        # Get all values needed in order to draw cone layout:
-        self.calculateCone(dictCone)
-        
-        # Draw the cone layout:
-        # Make top level group
-        t = 'translate(%s,%s)' % (self.svg.namedview.center[0], self.svg.namedview.center[1])
-        grp_attribs = {inkex.addNS('label','inkscape'):'Sheet Metal Conus Group', 'transform':t}
-        grp = etree.SubElement(self.svg.get_current_layer(), 'g', grp_attribs)
+        if self.options.offset != 0:
+            dictCone['offset'] = self.options.offset
+            dictCone['perimeterTolerance'] = self.options.perimeterTolerance
+        params = self.cacheParams(convFactor)
+
+        grp = self.selectedConeGroup()
+        if grp is not None:
+            # an unreadable attribute (edited by hand) is ignored, the group is drawn anew
+            stored = self.storedLayout(grp)
+            if stored is not None and stored['params'] == params:
+                # nothing changed at all
+                return grp
+            if stored is not None and all(stored['cone'].get(name) == dictCone.get(name) for name in self.coneInputs):
+                # same dimensions, only the drawing changes: reuse the solved cone
+                dictCone = stored['cone']
+            fresh = inkex.Group()
+            dictCone = self.renderLayout(dictCone, convFactor, params, fresh)
+            with self.profiler.phase('update'):
+                self.updateGroup(grp, fresh)
+        else:
+            # Draw the cone layout:
+            # Make top level group
+            t = 'translate(%s,%s)' % (self.svg.namedview.center[0], self.svg.namedview.center[1])
+            grp_attribs = {inkex.addNS('label','inkscape'):'Sheet Metal Conus Group', 'transform':t}
+            grp = etree.SubElement(self.svg.get_current_layer(), 'g', grp_attribs)
+            dictCone = self.renderLayout(dictCone, convFactor, params, grp)
+        # remember how the group was drawn for the next run
+        grp.set(self.paramsAttribute, json.dumps({'params': params, 'cone': self.storedCone(dictCone)}, sort_keys=True, separators=(',', ':')))
+        return grp
+
+    def renderLayout(self, dictCone, convFactor, params, grp):
+        " Draw layout and markup into grp, from the cache if enabled. Returns the solved cone "
+        if not self.options.cache:
+            self.drawParts(dictCone, convFactor, grp)
+            return dictCone
+        # reuse the markup of a cone drawn before with the same parameters
+        with self.profiler.phase('cache'):
+            directory = self.options.cacheDir or default_cache_dir()
+            cache = _caches.get(directory)
+            if cache is None:
+                cache = _caches[directory] = ConeCache(directory)
+            key = cache_key(params)
+            entry = cache.get(key)
+        if entry is None:
+            self.drawParts(dictCone, convFactor, grp)
+            with self.profiler.phase('cache'):
+                fragments = [etree.tostring(child, encoding='unicode') for child in grp]
+                # rules of the CSS classes the markup refers to, in the order they were defined
+                used = set(name for node in grp.iter() for name in (node.get('class') or '').split())
+                css = [[name, rule] for name, rule in self.markupRegistry().css.items() if name in used]
+                cache.put(key, {'cone': self.storedCone(dictCone), 'fragments': {'svg': fragments, 'css': css}})
+            return dictCone
+        for fragment in entry['fragments']['svg']:
+            grp.append(etree.fromstring(fragment))
+        # the cached markup and bend lines refer to the style rules and arrow markers in defs
+        for name, css in entry['fragments'].get('css', []):
+            self.markupRegistry().addRule(name, css)
+            # start markers were defined before end markers
+            for marker in sorted(re.findall(r'url\(#([^)]+)\)', css), key=lambda name: name.endswith('-end')):
+                self.makeMarkerstyle(marker, marker.endswith('-end'))
+        return entry['cone']
 
+    # Incremental update of a group drawn before
+    paramsAttribute = 'data-sheet-metal-conus'
+    # everything the solved cone depends on
+    coneInputs = ('diaBase', 'diaCut', 'heightCone', 'offset', 'perimeterTolerance')
+    # per generatrix results of an oblique cone, developed again rather than stored
+    obliqueLists = ('trueLengths', 'basePoints', 'cutPoints')
+
+    def storedCone(self, dictCone):
+        " The solved cone without the per generatrix lists, to be stored in the document or the cache "
+        return {name: value for name, value in dictCone.items() if name not in self.obliqueLists}
+
+    def selectedConeGroup(self):
+        " The selected group drawn by an earlier run (also if one of its children is selected) or None "
+        for node in self.svg.selection.values():
+            while node is not None:
+                if node.get(self.paramsAttribute) is not None:
+                    return node
+                node = node.getparent()
+        return None
+
+    def storedLayout(self, grp):
+        " Parameters and solved cone stored in grp by an earlier run, None if they can not be read "
+        try:
+            stored = json.loads(grp.get(self.paramsAttribute))
+            if isinstance(stored['params'], dict) and isinstance(stored['cone'], dict):
+                return stored
+        except (ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def updateGroup(self, grp, fresh):
+        """ Make the children of grp equal to the children of fresh. If both have the
+            same structure only changed attributes and texts are written, in place,
+            otherwise the children are replaced. The group itself (and its transform) is kept,
+            so is an embedded profile, effect() takes care of it.
+        """
+        metadata = inkex.addNS('metadata','svg')
+        drawn = [child for child in grp if child.tag != metadata]
+        if len(drawn) == len(fresh) and all(sameStructure(old, new) for old, new in zip(drawn, fresh)):
+            for old, new in zip(drawn, fresh):
+                copyChanges(old, new)
+        else:
+            for child in drawn:
+                grp.remove(child)
+            for child in list(fresh):
+                grp.append(child)
+
+    def cacheParams(self, convFactor):
+        " All options the drawn markup depends on, used as cache key "
+        return {'output': 'inkscape', 'documentScale': convFactor,
+                'diaBase': self.options.diaBase, 'diaCut': self.options.diaCut,
+                'heightCone': self.options.heightCone, 'units': self.options.units,
+                'strokeWidth': self.options.strokeWidth, 'strokeColour': str(self.options.strokeColour),
+                'verbose': bool(self.options.verbose),
+                'sheetWidth': self.options.sheetWidth, 'sheetHeight': self.options.sheetHeight,
+                'seamAllowance': self.options.seamAllowance, 'joggleTabs': self.options.joggleTabs,
+                'flattenTolerance': self.options.flattenTolerance,
+                'chain': self.options.chain.strip(),
+                'offset': self.options.offset, 'perimeterTolerance': self.options.perimeterTolerance,
+                'bendLines': self.options.bendLines, 'bendSpacing': self.options.bendSpacing,
+                'bendNumbers': bool(self.options.bendNumbers),
+                'precision': self.pathPrecision(convFactor)}
+
+    def pathPrecision(self, convFactor):
+        " Decimal places of the path data, by default rounding stays within UNIT_TOLERANCE of the units "
+        if self.options.precision >= 0:
+            return self.options.precision
+        return path_precision(self.options.units, convFactor)
+
+    def cutLineAttribs(self):
+        " Style and label of the cut line of a layout "
         linestyle = { 'stroke' : self.options.strokeColour, 'fill' : 'none',
-                      'stroke-width': str(self.svg.unittouu(str(self.options.strokeWidth) + self.options.units)) }
-        line_attribs = {'style' : str(inkex.Style(linestyle)), inkex.addNS('label','inkscape') : 'Cone' }
-        
-        # Connect the points into a single path of lines and arcs
-        zeroCenter=(0.0, 0.0)
-        angle = math.degrees(dictCone['angle'])
-        path = ""
-        path += self.build_line(dictCone['ptA'][0], dictCone['ptA'][1], dictCone['ptB'][0], dictCone['ptB'][1], convFactor) # A,B
-        path += " " + self.build_arc(zeroCenter[0], zeroCenter[1], 0.0, angle, dictCone.get('longRadius')*convFactor)
-        path += " " + self.build_line(dictCone['ptC'][0], dictCone['ptC'][1],dictCone['ptD'][0], dictCone['ptD'][1], convFactor) # C,D
-        path += self.build_arc(zeroCenter[0], zeroCenter[1], 0.0, angle, dictCone['shortRadius']*convFactor)
-        line_attribs['d'] = path
-        ell = etree.SubElement(grp, inkex.addNS('path','svg'), line_attribs )
-        
+                      'stroke-width': str(self.userUnits(str(self.options.strokeWidth) + self.options.units)) }
+        return {'style' : self.styleString(linestyle), inkex.addNS('label','inkscape') : 'Cone' }
+
+    def drawParts(self, dictCone, convFactor, grp):
+        " Draw the cone, or all sections of the chain if one is given, into the group grp "
+        if self.options.chain.strip():
+            self.drawChain(convFactor, grp)
+        else:
+            self.drawCone(dictCone, convFactor, grp)
+
+    def drawChain(self, convFactor, grp):
+        """ Solve all sections of the chain at once and draw their layouts below each
+            other, every section into a group of its own. Sections of equal geometry
+            are drawn once and copied.
+        """
+        if self.options.offset != 0:
+            raise inkex.AbortExtension('A chain is made of right frusta only, set the cut/apex offset to 0.')
+        with self.profiler.phase('solve'):
+            try:
+                shapes, sections = solve_chain(parse_stations(self.options.chain))
+            except ValueError as err:
+                raise inkex.AbortExtension('The chain can not be solved: %s.' % err)
+        drawn = {}
+        for number, ((shape, flipped), (dx, dy)) in enumerate(zip(sections, layout_chain(shapes, sections)), 1):
+            grp_attribs = {inkex.addNS('label','inkscape'): section_label(number, shapes[shape], flipped),
+                           'transform': 'translate(%s,%s)' % (dx*convFactor, dy*convFactor)}
+            section = etree.SubElement(grp, inkex.addNS('g','svg'), grp_attribs)
+            if shape in drawn:
+                for child in drawn[shape]:
+                    section.append(deepcopy(child))
+            elif shapes[shape].get('cylinder'):
+                with self.profiler.phase('layout'):
+                    line_attribs = self.cutLineAttribs()
+                    line_attribs['d'] = build_shape_path(shapes[shape], convFactor, self.options.flattenTolerance,
+                                                         self.pathPrecision(convFactor))
+                    etree.SubElement(section, inkex.addNS('path','svg'), line_attribs)
+            else:
+                self.drawCone(dict(shapes[shape]), convFactor, section)
+            drawn.setdefault(shape, list(section))
+
+    def drawCone(self, dictCone, convFactor, grp):
+        " Calculate the cone and draw its layout (and markup) into the group grp "
+        if 'offset' in dictCone:
+            self.drawObliqueCone(dictCone, convFactor, grp)
+            return
+        # Get all values needed in order to draw cone layout, unless they are known already
+        if 'longRadius' not in dictCone:
+            with self.profiler.phase('solve'):
+                self.calculateCone(dictCone)
+
+        with self.profiler.phase('layout'):
+            line_attribs = self.cutLineAttribs()
+
+            if self.options.sheetWidth > 0 and self.options.sheetHeight > 0:
+                self.drawGores(dictCone, convFactor, line_attribs, grp)
+            else:
+                line_attribs['d'] = self.build_cone_path(dictCone, convFactor, self.options.flattenTolerance,
+                                                         self.pathPrecision(convFactor))
+                ell = etree.SubElement(grp, inkex.addNS('path','svg'), line_attribs )
+        self.drawBendLines(dictCone, convFactor, grp)
+
         # Draw Dimensions Markup
         if self.options.verbose == True:
-            grp_attribs = {inkex.addNS('label','inkscape'):'markup'}
-            markup_group = etree.SubElement(grp, 'g', grp_attribs)
-            self.beVerbose(dictCone, convFactor, markup_group)
+            with self.profiler.phase('beVerbose'):
+                grp_attribs = {inkex.addNS('label','inkscape'):'markup'}
+                markup_group = etree.SubElement(grp, inkex.addNS('g','svg'), grp_attribs)
+                self.beVerbose(dictCone, convFactor, markup_group)
                 
-    def build_arc(self, x, y, start_angle, end_angle, radius, reverse=True, swap=False):
-        # Not using internal arc rep - instead construct path A in svg style directly
-        # so we can append lines to make single path
-        start = polar_to_cartesian(x, y, radius, end_angle)
-        end = polar_to_cartesian(x, y, radius, start_angle)
-        arc_flag = 0 if reverse else 1
-        sweep = 0 if (end_angle-start_angle) <=180 else 1
-        if swap: sweep = 1-sweep
-        path = 'M %s,%s' % (start[0], start[1])
-        path += " A %s,%s 0 %d %d %s %s" % (radius, radius, sweep, arc_flag, end[0], end[1])
-        return path
-    
-    def build_line(self, x1, y1, x2, y2, unitFactor):
-        path = 'M %s,%s L %s,%s' % (x1*unitFactor, y1*unitFactor, x2*unitFactor, y2*unitFactor)
-        return path
+    def drawGores(self, dictCone, convFactor, line_attribs, parent):
+        """ Split the layout into the smallest number of equal gores that fit the
+            stock sheet and draw every gore as a path of its own, in place.
+        """
+        seam = self.options.seamAllowance
+        tabs = self.options.joggleTabs
+        count = calculate_gore_count(dictCone, self.options.sheetWidth, self.options.sheetHeight, seam, tabs)
+        if count is None:
+            inkex.errormsg("The slant height of the cone is larger than the sheet, it can not be split into gores.")
+            count = 1
+        gore = gore_cone(dictCone, count)
+        path = build_gore_path(gore, convFactor, seam, tabs, self.options.flattenTolerance,
+                               self.pathPrecision(convFactor))
+        for index in range(count):
+            attribs = dict(line_attribs)
+            attribs[inkex.addNS('label','inkscape')] = 'Gore %d' % (index + 1)
+            attribs['d'] = path
+            attribs['transform'] = 'rotate(%s)' % math.degrees(index * gore['angle'])
+            etree.SubElement(parent, inkex.addNS('path','svg'), attribs)
+
+    def drawObliqueCone(self, dictCone, convFactor, grp):
+        " Develop an oblique cone by triangulation and draw its layout into the group grp "
+        if 'basePoints' not in dictCone:
+            with self.profiler.phase('solve'):
+                try:
+                    calculate_oblique_cone(dictCone, dictCone['perimeterTolerance'])
+                except ValueError as err:
+                    raise inkex.AbortExtension('The oblique cone can not be developed: %s.' % err)
+        with self.profiler.phase('layout'):
+            line_attribs = self.cutLineAttribs()
+            line_attribs['d'] = build_oblique_path(dictCone, convFactor, self.pathPrecision(convFactor))
+            etree.SubElement(grp, inkex.addNS('path','svg'), line_attribs)
+        self.drawBendLines(dictCone, convFactor, grp)
+        if self.options.sheetWidth > 0 and self.options.sheetHeight > 0:
+            inkex.errormsg("Oblique cones are not split into gores.")
+        if self.options.verbose == True:
+            inkex.errormsg("Oblique cone: %d generatrices, perimeter error %.6f %s, true lengths %.3f to %.3f %s."
+                           % (dictCone['generatrices'], dictCone['perimeterError'], self.options.units,
+                              min(dictCone['trueLengths']), max(dictCone['trueLengths']), self.options.units))
+
+    def drawBendLines(self, dictCone, convFactor, grp):
+        """ Draw the bend lines as one compound path, and their numbers as one text,
+            into a group of their own inside grp
+        """
+        count = self.options.bendLines
+        if count <= 0:
+            return
+        with self.profiler.phase('bendLines'):
+            inner, outer = bend_lines(dictCone, count, self.options.bendSpacing == 'adaptive')
+            stroke_width = max(0.1, self.userUnits(str(self.options.strokeWidth/2) + self.options.units))
+            line_style = { 'stroke': self.color_marker_bend, 'stroke-width': str(stroke_width), 'fill': 'none',
+                           'stroke-dasharray': '%s, %s' % (stroke_width*8, stroke_width*4) }
+            layer = etree.SubElement(grp, inkex.addNS('g','svg'), {inkex.addNS('label','inkscape'): 'bend lines'})
+            line_attribs = {'class': self.styleClass(line_style),
+                            inkex.addNS('label','inkscape'): 'Bend lines',
+                            'd': build_bend_path(inner, outer, convFactor, self.pathPrecision(convFactor))}
+            etree.SubElement(layer, inkex.addNS('path','svg'), line_attribs)
+            if self.options.bendNumbers == True:
+                lengths = [math.hypot(x, y) for x, y in outer.tolist()]
+                font_height = min(32, max( 8, int(self.userUnits(str(max(lengths)/40) + self.options.units))))
+                text_style = { 'font-size': str(font_height),
+                               'font-family': 'arial',
+                               'text-anchor': 'middle',
+                               'fill': self.color_marker_bend }
+                text = etree.SubElement(layer, inkex.addNS('text','svg'), {'class': self.styleClass(text_style),
+                                                        inkex.addNS('label','inkscape'): 'Bend numbers'})
+                for index, ((x, y), length) in enumerate(zip(outer.tolist(), lengths)):
+                    # just outside the base curve, in line with the bend
+                    scale = convFactor + font_height/length if length > 0 else 0
+                    tspan = etree.SubElement(text, inkex.addNS('tspan','svg'), {'x': '%.3f' % (x*scale), 'y': '%.3f' % (y*scale + font_height/3)})
+                    tspan.text = str(index + 1)
+
+    build_cone_path = staticmethod(build_cone_path)
+    build_arc = staticmethod(build_arc)
+    build_line = staticmethod(build_line)
 
     def beVerbose(self, dictCone, unitFactor, parent):
         """ Verbose output of calculated values. 
@@ -291,10 +615,10 @@ class SheetMetalConus(inkex.Effect):
         ptD = dictCone['ptD']
 
         # styles for markup
-        stroke_width = max(0.1, self.svg.unittouu(str(self.options.strokeWidth/2) + self.options.units))
+        stroke_width = max(0.1, self.userUnits(str(self.options.strokeWidth/2) + self.options.units))
         line_style = { 'stroke': self.color_marker_dim, 'stroke-width': str(stroke_width), 'fill':'none' }
-        arrow_style = self.dimline_style
-        font_height = min(32, max( 8, int(self.svg.unittouu(str(longradius/40) + self.options.units))))
+        arrow_style = dict(self.dimline_style)
+        font_height = min(32, max( 8, int(self.userUnits(str(longradius/40) + self.options.units))))
         text_style = { 'font-size': str(font_height),
                        'font-family': 'arial',
                        'text-anchor': 'middle',
@@ -311,62 +635,65 @@ class SheetMetalConus(inkex.Effect):
 
         # Mark center
         marker_length = max(5, longradius* unitFactor/100)
-        line_attribs = {'style' : str(inkex.Style(line_style)),
+        line_attribs = {'class': self.styleClass(line_style),
                         inkex.addNS('label','inkscape') : 'center',
                         'd' : 'M -{0},-{0} L {0},{0}'.format(marker_length)}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
-        line_attribs = {'style' : str(inkex.Style(line_style)),
+        line_attribs = {'class': self.styleClass(line_style),
                         inkex.addNS('label','inkscape') : 'center',
                         'd' : 'M -{0},{0} L {0},-{0}'.format(marker_length)}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
         # Draw tick marks
-        line_attribs = {'style' : str(inkex.Style(line_style)), 'd' : 'M 0,-3 L 0,-30'}
+        line_attribs = {'class': self.styleClass(line_style), 'd' : 'M 0,-3 L 0,-30'}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
         if cut_dia != 0:
-            line_attribs = {'style' : str(inkex.Style(line_style)), 'd' : 'M {0},-3 L {0},-30'.format(shortradius * unitFactor)}
+            line_attribs = {'class': self.styleClass(line_style), 'd' : 'M {0},-3 L {0},-30'.format(shortradius * unitFactor)}
             line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
-        line_attribs = {'style' : str(inkex.Style(line_style)), 'd' : 'M {0},-3 L {0},-30'.format(longradius * unitFactor)}
+        line_attribs = {'class': self.styleClass(line_style), 'd' : 'M {0},-3 L {0},-30'.format(longradius * unitFactor)}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
         # span line
         arrow_style['stroke'] = self.color_marker_dim
-        self.drawDimension((0,-10), (shortradius * unitFactor, -10), arrow_style, parent)
+        if cut_dia != 0:
+            self.drawDimension((0,-10), (shortradius * unitFactor, -10), arrow_style, parent)
         self.drawDimension((shortradius * unitFactor,-10), (longradius * unitFactor, -10), arrow_style, parent)
         # labels for short, long radii
         if cut_dia >= 0.001:
-            text_atts = {'style':str(inkex.Style(text_style)),
+            text_atts = {'class': self.styleClass(text_style),
                          'x': str(shortradius*unitFactor/2),
                          'y': str(-15) }
-            text = etree.SubElement(parent, 'text', text_atts)
+            text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
             text.text = "%4.3f" %(shortradius)
-        text_atts = {'style':str(inkex.Style(text_style)),
+        text_atts = {'class': self.styleClass(text_style),
                      'x': str((shortradius + (longradius-shortradius)/2)*unitFactor),
                      'y': str(-15) }
-        text = etree.SubElement(parent, 'text', text_atts)
+        text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
         text.text = "%4.3f" %(longradius)
         # Draw angle
         lowside = math.degrees(angle) < 180
         value = math.degrees(angle) if lowside else 360-math.degrees(angle)
         # radial limit lines
-        line_attribs = {'style' : str(inkex.Style(line_style)), 'd' : 'M 3,0 L %4.2f,0' % (ptA[0]*unitFactor*0.8)}
+        line_attribs = {'class': self.styleClass(line_style), 'd' : 'M 3,0 L %4.2f,0' % (ptA[0]*unitFactor*0.8)}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
-        line_attribs = {'style' : str(inkex.Style(line_style)), 'd' : 'M %4.2f,%4.2f L %4.2f,%4.2f' % (ptD[0]*unitFactor*0.02, ptD[1]*unitFactor*0.02,ptD[0]*unitFactor*0.8, ptD[1]*unitFactor*0.8)}
+        line_attribs = {'class': self.styleClass(line_style), 'd' : 'M %4.2f,%4.2f L %4.2f,%4.2f' % (ptD[0]*unitFactor*0.02, ptD[1]*unitFactor*0.02,ptD[0]*unitFactor*0.8, ptD[1]*unitFactor*0.8)}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
         # arc
-        arc_rad = ptA[0]*unitFactor*0.50
-        gap = self.svg.unittouu(str(font_height*2)+"pt")
+        # an uncut cone has no short radius, put the arc between center and base instead
+        arc_rad = (ptA[0] if cut_dia != 0 else ptB[0]/4)*unitFactor*0.50
+        gap = self.userUnits(str(font_height*2)+"pt")
         textpos = self.drawDimArc(0, 0, value, arc_rad, arrow_style, parent, gap, lowside)
         # angle label
         textpos[1] += font_height/4 if lowside else font_height/2
-        text_atts = {'style':str(inkex.Style(text_style)),
+        text_atts = {'class': self.styleClass(text_style),
                      'x': str(textpos[0]),
                      'y': str(textpos[1]) }
-        text = etree.SubElement(parent, 'text', text_atts)
+        text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
         text.text = "%4.2f deg" %(value)
         # chord lines
-        dash_style = deepcopy(arrow_style)
+        dash_style = dict(arrow_style)
         dash_style['stroke'] = self.color_marker_chords
         dash_style['stroke-dasharray'] = '4, 2, 1, 2'
-        line = self.drawDimension((ptA[0]*unitFactor, ptA[1]*unitFactor), (ptD[0]*unitFactor, ptD[1]*unitFactor), dash_style, parent)
+        if cut_dia != 0:
+            line = self.drawDimension((ptA[0]*unitFactor, ptA[1]*unitFactor), (ptD[0]*unitFactor, ptD[1]*unitFactor), dash_style, parent)
         line = self.drawDimension((ptB[0]*unitFactor, ptB[1]*unitFactor), (ptC[0]*unitFactor, ptC[1]*unitFactor), dash_style, parent)
         # chord labels
         centerx = ptB[0]*unitFactor + (ptC[0]-ptB[0])*unitFactor/2
@@ -374,9 +701,9 @@ class SheetMetalConus(inkex.Effect):
         line_angle = calc_angle_between_points(ptC, ptB)
         ypos = centery+font_height+2 if line_angle<0 else centery-2
         text_style['fill'] = self.color_marker_chords
-        text_atts = {'style':str(inkex.Style(text_style)),
+        text_atts = {'class': self.styleClass(text_style),
                      'transform': 'rotate(%f)' % (line_angle) }
-        text = etree.SubElement(parent, 'text', text_atts)
+        text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
         scale_matrix = [[1, 0.0, centerx], [0.0, 1, ypos]] # needs cos,sin corrections
         text.transform = Transform(scale_matrix) * text.transform
         text.text = "%4.2f" % (chord_base)
@@ -385,7 +712,7 @@ class SheetMetalConus(inkex.Effect):
             centery = ptA[1]*unitFactor + (ptD[1]-ptA[1])*unitFactor/2
             xpos = centerx - font_height*math.sin(math.radians(abs(line_angle)))
             ypos = centery-2 if line_angle>0 else centery+font_height+2
-            text = etree.SubElement(parent, 'text', text_atts)
+            text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
             scale_matrix = [[1, 0.0, centerx], [0.0, 1, ypos]]
             text.transform = Transform(scale_matrix) * text.transform
             text.text = "%4.2f" % (chord_cut)
@@ -394,12 +721,12 @@ class SheetMetalConus(inkex.Effect):
         text_style['fill'] = self.color_marker_base
         line_style['stroke'] = self.color_marker_base
         arrow_style['stroke'] = self.color_marker_base
-        line_attribs = {'style': str(inkex.Style(line_style)),
+        line_attribs = {'class': self.styleClass(line_style),
                         'd': 'M %f,%f L %f,%f %f,%f %f,%f z' %(-cut_dia/2*unitFactor,0, cut_dia/2*unitFactor,0, base_dia/2*unitFactor,cone_height*unitFactor, -base_dia/2*unitFactor,cone_height*unitFactor)}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
         line.transform = Transform(frustrum_repos) * line.transform
         # ticks
-        line_attribs = {'style': str(inkex.Style(line_style)),
+        line_attribs = {'class': self.styleClass(line_style),
                         'd': 'M %f,%f L %f,%f' %(-(5+cut_dia/2*unitFactor),0, -(5+base_dia/2*unitFactor),0 )}
         line = etree.SubElement(parent, inkex.addNS('path','svg'), line_attribs)
         line.transform = Transform(frustrum_repos) * line.transform
@@ -407,24 +734,25 @@ class SheetMetalConus(inkex.Effect):
         line = self.drawDimension((-base_dia/2*unitFactor,0), (-base_dia/2*unitFactor,cone_height*unitFactor), arrow_style, parent)
         line.transform = Transform(frustrum_repos) * line.transform
         # frustum text
-        text_atts = {'style':str(inkex.Style(text_style)),
+        text_atts = {'class': self.styleClass(text_style),
                      'x': str(-(18+base_dia/2*unitFactor)),
                      'y': str(cone_height*unitFactor/2) }
-        text = etree.SubElement(parent, 'text', text_atts)
+        text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
         text.text = "%4.3f" %(cone_height)
         text.transform = Transform(frustrum_repos) * text.transform
         if cut_dia >= 0.001:
-            text_atts = {'style':str(inkex.Style(text_style)),
+            text_atts = {'class': self.styleClass(text_style),
                          'x': '0',
                          'y': str(font_height) }
-            text = etree.SubElement(parent, 'text', text_atts)
+            text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
             text.text = "%4.3f" %(cut_dia)
             text.transform = Transform(frustrum_repos) * text.transform
-        text_atts = {'style':str(inkex.Style(text_style)),
+        text_atts = {'class': self.styleClass(text_style),
                      'x': '0',
                      'y': str(cone_height*unitFactor+font_height) }
-        text = etree.SubElement(parent, 'text', text_atts)
+        text = etree.SubElement(parent, inkex.addNS('text','svg'), text_atts)
         text.text = "%4.3f" %(base_dia)
         text.transform = Transform(frustrum_repos) * text.transform
-        
-SheetMetalConus().run()
+
+if __name__ == '__main__':
+    SheetMetalConus().run()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Headless batch front end for the Sheet Metal Conus extension.
+
+    Reads cone specifications from a CSV or JSONL file (one cone per row with the
+    columns diaBase, diaCut, heightCone and an optional name) and writes one
+    cutting layout per row as SVG, DXF and/or G-code, or all layouts into one combined file.
+    Rows are read, solved and written as a stream, and the work is spread over a
+    process pool, so very large jobs neither need a running Inkscape nor
+    unbounded memory.
+
+    Example:
+        python3 sheet_metal_conus_batch.py parts.csv -o layouts --format svg dxf gcode
+        python3 sheet_metal_conus_batch.py parts.jsonl --combined all_parts.svg
+"""
+
+import argparse
+import io
+import math
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from sheet_metal_conus_geometry import build_cone_path, calculate_cones, cone_to_dict, sector_bounding_box
+from sheet_metal_conus_cli import (SVG_HEADER, SVG_FOOTER, UNIT_TO_PX, add_layout_arguments, guess_format, layout_options,
+                                   line_style, open_input, part_name, read_rows)
+from sheet_metal_conus_export import EXPORTERS
+from sheet_metal_conus_cache import ConeCache, cache_key, default_cache_dir, format_stats
+
+# space between layouts in combined output (in units)
+COMBINED_GAP = 10.0
+
+# Reading input
+def chunked(iterable, size):
+    " Split the row stream into lists of at most size (index, row) pairs "
+    iterator = enumerate(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def unique_names(rows):
+    """ Yield the rows, renaming those whose file name stem was used by an earlier
+        row by appending their row number, so no output file is overwritten
+    """
+    seen = set()
+    for index, row in enumerate(rows):
+        name = part_name(index, row)
+        if name in seen:
+            unique = name
+            while unique in seen:
+                unique = '%s_%d' % (unique, index + 1)
+            sys.stderr.write('Row %d: the name %s is used by an earlier row, writing %s instead.\n' % (index + 1, name, unique))
+            row = dict(row, name=unique)
+            name = unique
+        seen.add(name)
+        yield row
+
+# Rendering
+def render_svg_part(dictCone, options, dx=0.0, dy=0.0):
+    " Cone group for one layout, coordinates in units shifted by (dx, dy) "
+    scale = UNIT_TO_PX[options['units']]
+    style = line_style(options)
+    return '<g inkscape:label="Sheet Metal Conus Group" transform="scale(%s) translate(%s,%s)">' \
+           '<path style="%s" inkscape:label="Cone" d="%s"/></g>\n' \
+           % (scale, dx, dy, style, build_cone_path(dictCone, 1.0, options.get('tolerance'), options.get('precision')))
+
+def render_svg(dictCone, options):
+    " Stand-alone SVG document sized to the layout "
+    margin = options['strokeWidth']
+    xmin, ymin, xmax, ymax = sector_bounding_box(dictCone['shortRadius'], dictCone['longRadius'], dictCone['angle'])
+    width = xmax - xmin + 2*margin
+    height = ymax - ymin + 2*margin
+    units = options['units']
+    scale = UNIT_TO_PX[units]
+    size = ' width="%s%s" height="%s%s" viewBox="0 0 %s %s"' % (width, units, height, units, width*scale, height*scale)
+    return SVG_HEADER % size + render_svg_part(dictCone, options, margin-xmin, margin-ymin) + SVG_FOOTER
+
+def render_layout(fmt, dictCone, options):
+    " Stand-alone layout of one cone in the given format as a string "
+    if fmt == 'svg':
+        return render_svg(dictCone, options)
+    out = io.StringIO()
+    with EXPORTERS[fmt](out, options['units'], tolerance=options.get('tolerance')) as writer:
+        writer.write_cone(dictCone)
+    return out.getvalue()
+
+# Worker side
+def solve_chunk(chunk):
+    """ Solve a chunk of (index, row) pairs in one vectorized pass.
+        Returns (index, name, dictCone) per row, dictCone is None for invalid rows.
+    """
+    diaBase = []
+    diaCut = []
+    heightCone = []
+    for index, row in chunk:
+        try:
+            diaBase.append(float(row['diaBase']))
+            diaCut.append(float(row.get('diaCut') or 0.0))
+            heightCone.append(float(row['heightCone']))
+        except (KeyError, TypeError, ValueError):
+            diaBase.append(math.nan)
+            diaCut.append(math.nan)
+            heightCone.append(math.nan)
+    cones = calculate_cones(diaBase, diaCut, heightCone)
+    results = []
+    for (index, row), cone, invalid in zip(chunk, cones, cones.mask['angle']):
+        results.append((index, part_name(index, row), None if invalid else cone_to_dict(cone)))
+    return results
+
+# one cache per worker process and directory
+_caches = {}
+
+def layout_params(dictCone, options):
+    " Everything the rendered layouts of a cone depend on, used as cache key "
+    return {'diaBase': dictCone['diaBase'], 'diaCut': dictCone['diaCut'], 'heightCone': dictCone['heightCone'],
+            'units': options['units'], 'strokeWidth': options['strokeWidth'],
+            'strokeColour': options['strokeColour'], 'tolerance': options.get('tolerance'),
+            'precision': options.get('precision'), 'verbose': False}
+
+def write_chunk(chunk, options):
+    """ Solve a chunk and write one file per row and format.
+        Returns the solved rows and the cache statistics of this chunk.
+    """
+    cache = None
+    if options.get('cache'):
+        cache = _caches.get(options['cache'])
+        if cache is None:
+            cache = _caches[options['cache']] = ConeCache(options['cache'])
+        before = dict(cache.stats)
+    results = solve_chunk(chunk)
+    for index, name, dictCone in results:
+        if dictCone is None:
+            continue
+        fragments = {}
+        if cache:
+            key = cache_key(layout_params(dictCone, options))
+            entry = cache.get(key)
+            fragments = dict(entry['fragments']) if entry else {}
+        missing = [fmt for fmt in options['formats'] if fmt not in fragments]
+        for fmt in missing:
+            fragments[fmt] = render_layout(fmt, dictCone, options)
+        if cache and missing:
+            cache.put(key, {'cone': dictCone, 'fragments': fragments})
+        for fmt in options['formats']:
+            filename = os.path.join(options['outdir'], name + '.' + fmt)
+            with open(filename, 'w', newline='\n') as f:
+                f.write(fragments[fmt])
+    stats = {name: cache.stats[name] - before[name] for name in before} if cache else None
+    return [(index, name, dictCone is not None) for index, name, dictCone in results], stats
+
+def stream_results(func, chunks, jobs, *args):
+    """ Apply func to every chunk and yield the results in input order.
+        With more than one job the chunks are handed to a process pool, but never
+        more than two chunks per worker are in flight, which keeps memory bounded.
+    """
+    if jobs <= 1:
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk, *args))
+            if len(pending) >= 2*jobs:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# Main process side
+def write_combined(out, fmt, chunks, options, report):
+    " Stream all layouts into one file, stacked below each other "
+    if fmt == 'svg':
+        out.write(SVG_HEADER % '')
+        writer = None
+    else:
+        writer = EXPORTERS[fmt](out, options['units'], tolerance=options.get('tolerance'))
+    offset = 0.0
+    for results in stream_results(solve_chunk, chunks, options['jobs']):
+        for index, name, dictCone in results:
+            report(index, name, dictCone is not None)
+            if dictCone is None:
+                continue
+            xmin, ymin, xmax, ymax = sector_bounding_box(dictCone['shortRadius'], dictCone['longRadius'], dictCone['angle'])
+            if writer is None:
+                out.write(render_svg_part(dictCone, options, -xmin, offset-ymin))
+            else:
+                writer.write_cone(dictCone, -xmin, offset-ymin, name)
+            offset += ymax - ymin + COMBINED_GAP
+    if writer is None:
+        out.write(SVG_FOOTER)
+    else:
+        writer.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write sheet metal cone cutting layouts for every row of a CSV or JSONL file.')
+    parser.add_argument('input', help='CSV or JSONL file with the columns diaBase, diaCut, heightCone and optionally name ("-" for stdin).')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help='Format of the input, guessed from the file extension if omitted.')
+    parser.add_argument('-o', '--outdir', default='.', help='Directory for the per row output files.')
+    parser.add_argument('-t', '--format', nargs='+', choices=['svg'] + sorted(EXPORTERS), default=['svg'], dest='formats', help='Output formats written for every row.')
+    parser.add_argument('--combined', metavar='FILE', help='Write all layouts into this single .svg, .dxf or .gcode file instead of one file per row.')
+    add_layout_arguments(parser)
+    parser.add_argument('--cache', nargs='?', const=default_cache_dir(), metavar='DIR', help='Reuse layouts of sizes rendered before from this cache directory (default %s).' % default_cache_dir())
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes.')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Number of rows solved together by one worker.')
+    args = parser.parse_args(argv)
+
+    options = layout_options(args, formats=args.formats, outdir=args.outdir, jobs=args.jobs, cache=args.cache)
+    fmt = args.input_format or guess_format(args.input)
+    skipped = []
+
+    def report(index, name, ok):
+        if not ok:
+            skipped.append(name)
+            sys.stderr.write('Skipping row %d (%s): cone can not be unrolled.\n' % (index + 1, name))
+
+    with open_input(args.input) as infile:
+        chunks = chunked(unique_names(read_rows(infile, fmt)), max(1, args.chunk_size))
+        if args.combined:
+            outfmt = os.path.splitext(args.combined)[1].lower().lstrip('.')
+            outfmt = outfmt if outfmt in EXPORTERS else 'svg'
+            with open(args.combined, 'w', newline='\n') as out:
+                write_combined(out, outfmt, chunks, options, report)
+        else:
+            os.makedirs(args.outdir, exist_ok=True)
+            totals = None
+            for results, stats in stream_results(write_chunk, chunks, args.jobs, options):
+                for index, name, ok in results:
+                    report(index, name, ok)
+                if stats:
+                    totals = {name: (totals or {}).get(name, 0) + value for name, value in stats.items()}
+            if totals:
+                sys.stderr.write(format_stats(totals) + '\n')
+    return 1 if skipped else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
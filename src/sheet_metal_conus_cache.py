@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Memoization of solved cones and their rendered output.
+
+    Entries are addressed by a hash of all parameters that influence the result
+    (diaBase, diaCut, heightCone, units, strokeWidth, verbose, ...), so the same
+    standard sizes are only calculated and rendered once. A small in-process LRU
+    layer sits in front of an on-disk layer that is shared between processes and
+    runs; the disk layer evicts the least recently used entries once it grows
+    beyond its size limit.
+
+    An entry is a JSON compatible dictionary, usually
+        {'cone': dictCone, 'fragments': {'svg': ..., 'dxf': ...}}
+    Entries returned by get() are shared and must not be modified.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+def default_cache_dir():
+    " Per user cache directory, following the XDG convention "
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sheet_metal_conus')
+
+def cache_key(params):
+    """ Content address of a parameter dictionary.
+        Floats are written with repr() so only identical values share a key.
+    """
+    text = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _restore_points(entry):
+    " JSON turns the point tuples of a cone into lists, turn them back "
+    cone = entry.get('cone')
+    if cone:
+        for name in ('ptA', 'ptB', 'ptC', 'ptD'):
+            if name in cone:
+                cone[name] = tuple(cone[name])
+    return entry
+
+def format_stats(stats):
+    " One line summary of hit and miss counters, also for counters summed over several caches "
+    lookups = stats['hits'] + stats['misses']
+    rate = 100.0 * stats['hits'] / lookups if lookups else 0.0
+    return 'Cache: %d hits (%d from disk), %d misses, %d evictions, hit rate %.1f %%' \
+           % (stats['hits'], stats['diskHits'], stats['misses'], stats['evictions'], rate)
+
+class ConeCache:
+    """ Two level cache: an LRU dictionary of at most maxEntries entries in memory
+        and JSON files in directory (None for memory only) of at most maxBytes in total.
+    """
+    def __init__(self, directory=None, maxEntries=256, maxBytes=64*1024*1024):
+        self.directory = directory
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.memory = OrderedDict()
+        self.stats = {'hits': 0, 'diskHits': 0, 'misses': 0, 'evictions': 0}
+        self.diskBytes = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxEntries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        " The entry stored under key or None, counted as hit or miss "
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    entry = _restore_points(json.load(f))
+                # mark as recently used for the eviction
+                os.utime(path)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                self.stats['hits'] += 1
+                self.stats['diskHits'] += 1
+                return entry
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key, entry):
+        " Store entry in memory and, if configured, on disk "
+        self._remember(key, entry)
+        if not self.directory:
+            return
+        path = self._path(key)
+        data = json.dumps(entry, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a private file first, other processes only ever see complete entries
+        temp = '%s.%d.tmp' % (path, os.getpid())
+        with open(temp, 'wb') as f:
+            f.write(data)
+        # an existing entry is replaced, only the difference counts
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(temp, path)
+        if self.diskBytes is None:
+            self.diskBytes = sum(size for _, size, _ in self._files())
+        else:
+            self.diskBytes += len(data) - replaced
+        if self.diskBytes > self.maxBytes:
+            self._evict()
+
+    def lookup(self, params, compute):
+        """ Returns the entry for the parameter dictionary, calling compute()
+            to create and store it if it is not cached yet.
+        """
+        key = cache_key(params)
+        entry = self.get(key)
+        if entry is None:
+            entry = compute()
+            self.put(key, entry)
+        return entry
+
+    def _files(self):
+        " (path, size, mtime) of all entries on disk "
+        for sub in os.listdir(self.directory):
+            folder = os.path.join(self.directory, sub)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                yield path, info.st_size, info.st_mtime
+
+    def _evict(self):
+        " Remove least recently used files until the disk layer is below 3/4 of its limit "
+        files = sorted(self._files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.maxBytes * 3 // 4
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats['evictions'] += 1
+        self.diskBytes = total
+
+    def report(self):
+        " One line summary of the statistics "
+        return format_stats(self.stats)
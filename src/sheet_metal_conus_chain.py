@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Chains of frusta welded end to end, like long reducers and transitions.
+
+    A chain is given by its diameter profile, stations of diameter and height
+    along the axis such as '300@0 250@200 250@300 150@450'. Every pair of
+    neighbouring stations is one section: a frustum, or a cylinder where both
+    diameters are equal, that fits the section before and after it. All frusta
+    are solved together in one vectorized pass with calculate_cones(), sections
+    of identical geometry only once, and the patterns of all sections are laid
+    out below each other into one document.
+
+    Example:
+        python3 sheet_metal_conus_chain.py "300@0 250@200 250@300 150@450" -o reducer.svg
+        python3 sheet_metal_conus_chain.py profile.csv --precision 2 -o reducer.svg
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+
+from sheet_metal_conus_geometry import (absolute_path, build_cone_path, calculate_cones, compact_path,
+                                        cone_to_dict, sector_bounding_box)
+from sheet_metal_conus_cli import (SVG_HEADER, SVG_FOOTER, UNIT_TO_PX, add_layout_arguments, guess_format,
+                                   layout_options, line_style, open_input, read_rows)
+
+# space between the patterns of two sections (in units)
+SECTION_GAP = 10.0
+
+# Profile
+def parse_stations(text):
+    " (diameter, height) of every station in text like '300@0, 250@200; 150@350' "
+    stations = []
+    for item in re.split(r'[\s,;]+', text.strip()):
+        if not item:
+            continue
+        diameter, sep, height = item.partition('@')
+        try:
+            stations.append((float(diameter), float(height)))
+        except ValueError:
+            raise ValueError('station %r is not given as diameter@height' % item)
+    return stations
+
+def chain_sections(stations):
+    """ (diaBase, diaCut, heightCone, flipped) of the section between every two
+        neighbouring stations. The larger diameter is the base of a section,
+        flipped sections widen towards the top of the chain.
+    """
+    if len(stations) < 2:
+        raise ValueError('a chain needs at least two stations')
+    sections = []
+    for (lowDia, lowHeight), (highDia, highHeight) in zip(stations, stations[1:]):
+        if not highHeight > lowHeight:
+            raise ValueError('the station heights must increase, %s follows %s' % (highHeight, lowHeight))
+        if min(lowDia, highDia) < 0 or max(lowDia, highDia) <= 0:
+            raise ValueError('the diameters must be positive')
+        sections.append((max(lowDia, highDia), min(lowDia, highDia), highHeight - lowHeight, highDia > lowDia))
+    return sections
+
+# Solving
+def solve_chain(stations):
+    """ Solve all sections of a chain. Returns (shapes, sections): the geometry of
+        every distinct section and (shape index, flipped) per section.
+        Frusta are dictionaries as filled in by calculate_cone(), all solved in one
+        call of calculate_cones(). Cylinders are unrolled into a rectangle, they
+        have 'cylinder' set and get a width and a height.
+    """
+    # heights are differences of stations, so equal sections may differ in the last bits
+    keys = {}
+    sections = []
+    for diaBase, diaCut, height, flipped in chain_sections(stations):
+        key = (round(diaBase, 9), round(diaCut, 9), round(height, 9))
+        sections.append((keys.setdefault(key, len(keys)), flipped))
+    keys = list(keys)
+    shapes = [{'diaBase': diaBase, 'diaCut': diaCut, 'heightCone': height, 'cylinder': True,
+               'width': math.pi * diaBase, 'height': height} for diaBase, diaCut, height in keys]
+    frusta = [index for index, key in enumerate(keys) if key[1] < key[0]]
+    if frusta:
+        solved = calculate_cones(*zip(*[keys[index] for index in frusta]))
+        for index, cone in zip(frusta, solved):
+            shapes[index] = cone_to_dict(cone)
+    return shapes, sections
+
+def shape_bounding_box(shape):
+    " Bounding box (xmin, ymin, xmax, ymax) of the pattern of one section "
+    if shape.get('cylinder'):
+        return (0.0, 0.0, shape['width'], shape['height'])
+    return sector_bounding_box(shape['shortRadius'], shape['longRadius'], shape['angle'])
+
+def build_shape_path(shape, convFactor, tolerance=None, precision=None):
+    " Closed path of the pattern of one section, see build_cone_path() "
+    if not shape.get('cylinder'):
+        return build_cone_path(shape, convFactor, tolerance, precision)
+    width = shape['width']
+    height = shape['height']
+    outline = ((0.0, 0.0), [('L', (width, 0.0)), ('L', (width, height)), ('L', (0.0, height))])
+    if precision is not None:
+        return compact_path(*outline, convFactor, precision)
+    return absolute_path(*outline, convFactor)
+
+def layout_chain(shapes, sections, gap=SECTION_GAP):
+    " Offsets (dx, dy) in units placing the pattern of every section left aligned below the one before "
+    offsets = []
+    top = 0.0
+    for shape, flipped in sections:
+        xmin, ymin, xmax, ymax = shape_bounding_box(shapes[shape])
+        offsets.append((-xmin, top - ymin))
+        top += ymax - ymin + gap
+    return offsets
+
+def section_label(number, shape, flipped):
+    " Name of a section like 'Section 2: 250 to 150, height 150' "
+    low, high = shape['diaBase'], shape['diaCut']
+    if flipped:
+        low, high = high, low
+    return 'Section %d: %g to %g, height %g' % (number, low, high, shape['heightCone'])
+
+# Output
+def render_chain_svg(shapes, sections, options):
+    " SVG document with the patterns of all sections, every distinct path is built once "
+    offsets = layout_chain(shapes, sections, options.get('gap', SECTION_GAP))
+    margin = options['strokeWidth']
+    boxes = [shape_bounding_box(shapes[shape]) for shape, flipped in sections]
+    width = max(xmax - xmin for xmin, ymin, xmax, ymax in boxes)
+    height = offsets[-1][1] + boxes[-1][3]
+    units = options['units']
+    scale = UNIT_TO_PX[units]
+    size = ' width="%s%s" height="%s%s" viewBox="0 0 %s %s"' % (width + 2*margin, units, height + 2*margin, units,
+                                                            (width + 2*margin)*scale, (height + 2*margin)*scale)
+    style = line_style(options)
+    paths = {}
+    out = [SVG_HEADER % size, '<g inkscape:label="Chain" transform="scale(%s) translate(%s,%s)">\n' % (scale, margin, margin)]
+    for number, ((shape, flipped), (dx, dy)) in enumerate(zip(sections, offsets), 1):
+        if shape not in paths:
+            paths[shape] = build_shape_path(shapes[shape], 1.0, options.get('tolerance'), options.get('precision'))
+        out.append('<g inkscape:label="%s" transform="translate(%s,%s)"><path style="%s" inkscape:label="Cone" d="%s"/></g>\n'
+                   % (section_label(number, shapes[shape], flipped), dx, dy, style, paths[shape]))
+    out.append('</g>\n')
+    out.append(SVG_FOOTER)
+    return ''.join(out)
+
+def read_stations(filename, fmt=None):
+    " Stations from a CSV or JSONL file (or stdin for '-') with the columns diameter and height "
+    with open_input(filename) as f:
+        return [(float(row['diameter']), float(row['height'])) for row in read_rows(f, fmt or guess_format(filename))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solve and lay out a chain of frusta welded end to end.')
+    parser.add_argument('profile', help='Stations as "diameter@height ..." or a CSV or JSONL file with the columns diameter and height ("-" for stdin).')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help='Format of the profile file, guessed from the file extension if omitted.')
+    parser.add_argument('-o', '--output', default='chain.svg', help='The SVG file for the patterns of all sections.')
+    parser.add_argument('-g', '--gap', type=float, default=SECTION_GAP, help='Space between two patterns in units.')
+    add_layout_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.profile == '-' or os.path.isfile(args.profile):
+            stations = read_stations(args.profile, args.input_format)
+        else:
+            stations = parse_stations(args.profile)
+        shapes, sections = solve_chain(stations)
+    except (KeyError, ValueError) as err:
+        parser.error('invalid profile: %s' % err)
+    options = layout_options(args, gap=args.gap)
+    with open(args.output, 'w', newline='\n') as f:
+        f.write(render_chain_svg(shapes, sections, options))
+    print('%s: %d sections, %d distinct patterns, total height %g %s'
+          % (args.output, len(sections), len(shapes), stations[-1][1] - stations[0][1], args.units))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Input, option and SVG helpers shared by the command line tools.
+
+    The batch, nesting and chain tools read their rows from the same CSV or
+    JSONL files, take the same units, line and path options and write the same
+    kind of stand-alone SVG documents. This module only depends on the standard
+    library and the geometry module, so importing it (as the chain tool does
+    for the Inkscape effect) does not pull in the process pool, exporters or
+    cache of the batch tool.
+"""
+
+import csv
+import json
+import re
+import sys
+from contextlib import contextmanager
+
+from sheet_metal_conus_geometry import path_precision
+
+# user units (px at 96 dpi) per unit, the same factors Inkscape uses
+UNIT_TO_PX = {'px': 1.0, 'pt': 4.0/3.0, 'mm': 96.0/25.4, 'cm': 96.0/2.54, 'in': 96.0}
+
+SVG_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n' \
+             '<svg xmlns="http://www.w3.org/2000/svg" ' \
+             'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"%s>\n'
+SVG_FOOTER = '</svg>\n'
+
+# Reading input
+def read_rows(stream, fmt):
+    """ Yield one dictionary per cone specification in the CSV or JSONL stream.
+        A JSONL line that is malformed or not an object yields an empty row,
+        which the tools report as invalid like a row with missing values.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield row
+    else:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else {}
+
+@contextmanager
+def open_input(filename):
+    " Input stream of a command line tool, stdin for '-' (which is left open) "
+    if filename == '-':
+        yield sys.stdin
+    else:
+        with open(filename, newline='') as f:
+            yield f
+
+def guess_format(filename):
+    " Input format from the file extension, jsonl for anything that is not .csv "
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+def part_name(index, row):
+    " File name stem for a row, from its name column or its position in the input "
+    name = str(row.get('name') or '').strip()
+    if not name:
+        return 'cone_%06d' % (index + 1)
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name)
+
+# Options of the drawn layouts
+def add_layout_arguments(parser):
+    " Add the units, line and path options to the argument parser "
+    parser.add_argument('-u', '--units', default='mm', choices=sorted(UNIT_TO_PX), help='The units in which the cone values are given.')
+    parser.add_argument('-w', '--strokeWidth', type=float, default=0.3, help='The line thickness in given unit.')
+    parser.add_argument('-f', '--strokeColour', default='#000000', help='The line colour.')
+    parser.add_argument('--flatten', type=float, metavar='TOL', help='Replace arcs by polylines deviating at most TOL units from the true arcs, for cutters and CAM importers without arc support.')
+    parser.add_argument('--precision', type=int, metavar='DIGITS', help='Decimal places of the SVG path coordinates (default: as fine as needed for the units).')
+
+def layout_options(args, **options):
+    " Options dictionary of the renderers from the parsed layout arguments, further options are added as is "
+    options.update({'units': args.units, 'strokeWidth': args.strokeWidth, 'strokeColour': args.strokeColour,
+                    'tolerance': args.flatten,
+                    'precision': path_precision(args.units) if args.precision is None else args.precision})
+    return options
+
+def line_style(options):
+    " Style attribute of the cut lines "
+    return 'fill:none;stroke:%s;stroke-width:%s' % (options['strokeColour'], options['strokeWidth'])
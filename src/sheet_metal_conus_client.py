@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Thin client entry point of the Sheet Metal Conus extension.
+
+    Forwards the command line and the input document to a running
+    sheet_metal_conus_daemon.py and writes the rendered document to stdout.
+    If no daemon is running, the effect is run in this process as before.
+    Takes the same arguments as sheet_metal_conus.py.
+"""
+
+import os
+import sys
+
+from sheet_metal_conus_daemon import connect, default_address, read_token, receive_message, send_message
+
+def split_input(args):
+    " (arguments for the effect, input file or None), Inkscape passes the input file last "
+    if args and not args[-1].startswith('-') and os.path.isfile(args[-1]):
+        return args[:-1], args[-1]
+    return args, None
+
+def split_output(args):
+    " (arguments for the effect, output file or None), the client writes the output file itself "
+    rest = []
+    output = None
+    args = iter(args)
+    for arg in args:
+        if arg.startswith('--output='):
+            output = arg[len('--output='):]
+        elif arg == '--output':
+            output = next(args, None)
+        else:
+            rest.append(arg)
+    return rest, output
+
+def run_in_daemon(args):
+    """ Render through the daemon and return the exit status,
+        or None if no daemon is listening.
+    """
+    address = default_address()
+    header = {}
+    if isinstance(address, tuple):
+        # a daemon listening on TCP only accepts requests with its token
+        header['token'] = read_token(address)
+        if header['token'] is None:
+            return None
+    try:
+        sock = connect(address)
+    except PermissionError as err:
+        sys.stderr.write('Not using the daemon: %s\n' % err)
+        return None
+    except OSError:
+        return None
+    with sock:
+        effectArgs, inputFile = split_input(args)
+        effectArgs, outputFile = split_output(effectArgs)
+        if inputFile is None:
+            document = sys.stdin.buffer.read()
+        else:
+            with open(inputFile, 'rb') as f:
+                document = f.read()
+        header['args'] = effectArgs
+        header['cwd'] = os.getcwd()
+        if inputFile is not None:
+            header['documentPath'] = os.path.abspath(inputFile)
+        send_message(sock, header, document)
+        response, output = receive_message(sock)
+    if response.get('stderr'):
+        sys.stderr.write(response['stderr'])
+    if outputFile is None:
+        sys.stdout.buffer.write(output)
+        sys.stdout.buffer.flush()
+    elif response.get('status', 1) == 0:
+        with open(outputFile, 'wb') as f:
+            f.write(output)
+    return response.get('status', 1)
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    status = run_in_daemon(args)
+    if status is None:
+        # no daemon, the same as calling sheet_metal_conus.py
+        from sheet_metal_conus import SheetMetalConus
+        SheetMetalConus().run(args)
+        status = 0
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
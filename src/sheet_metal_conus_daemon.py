@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Resident render daemon for the Sheet Metal Conus extension.
+
+    Keeps inkex, lxml and the geometry and rendering code loaded, so scripted
+    runs do not pay for interpreter startup and imports every time. The daemon
+    listens on a Unix socket (or a localhost TCP port where Unix sockets are not
+    available) and renders one document per connection. On systems with fork()
+    every request is handled in a forked child of the warm process, so
+    concurrent clients run in parallel and can not disturb each other; elsewhere
+    requests are accepted by threads and rendered one after the other.
+
+    sheet_metal_conus_client.py is the thin client used as entry point of the
+    .inx file, it falls back to running the effect in-process if no daemon runs.
+
+    Example:
+        python3 sheet_metal_conus_daemon.py &
+        python3 sheet_metal_conus_client.py --diaBase=400 drawing.svg > out.svg
+
+    Wire format of requests and responses: two unsigned 32 bit big endian
+    lengths, a JSON header of the first length and a payload (the SVG document)
+    of the second length. Only the standard library is imported at module level,
+    so the client can use these functions without loading inkex.
+
+    The default socket lives in a directory only the user can access, and clients
+    only connect to sockets owned by themselves. Over TCP every local user could
+    connect, so there the daemon writes a random token into a file only its user
+    can read, and requests without that token are refused.
+"""
+
+import argparse
+import hmac
+import io
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import redirect_stderr
+
+# environment variable overriding the address, a socket path or host:port
+ADDRESS_VARIABLE = 'SHEET_METAL_CONUS_DAEMON'
+DEFAULT_PORT = 47265
+_LENGTHS = struct.Struct('!II')
+
+def runtime_dir():
+    " Directory for the socket and the token file that only the current user can access "
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.environ['XDG_RUNTIME_DIR']
+    if hasattr(os, 'getuid'):
+        # the shared temporary directory gets a private sub directory
+        return os.path.join(tempfile.gettempdir(), 'sheet_metal_conus-%d' % os.getuid())
+    return os.path.join(os.path.expanduser('~'), '.sheet_metal_conus')
+
+def check_private(path):
+    """ Raise PermissionError unless path is owned by the current user and, for a
+        directory, not accessible by anybody else. Does nothing where there are no user ids.
+    """
+    if not hasattr(os, 'getuid'):
+        return
+    info = os.lstat(path)
+    if info.st_uid != os.getuid():
+        raise PermissionError('%s is owned by another user' % path)
+    if stat.S_ISDIR(info.st_mode) and info.st_mode & 0o077:
+        raise PermissionError('%s can be accessed by other users' % path)
+
+def make_private_dir(path):
+    " Create the directory path with mode 0700 if it does not exist and check it is private "
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    check_private(path)
+
+def default_address():
+    " Socket path (or (host, port) pair) the daemon listens on and clients connect to "
+    address = os.environ.get(ADDRESS_VARIABLE)
+    if address:
+        return parse_address(address)
+    if hasattr(socket, 'AF_UNIX'):
+        return os.path.join(runtime_dir(), 'sheet_metal_conus.sock')
+    return ('127.0.0.1', DEFAULT_PORT)
+
+def token_file(address):
+    " File holding the token of the daemon listening on the (host, port) pair address "
+    return os.path.join(runtime_dir(), 'daemon-%d.token' % address[1])
+
+def read_token(address):
+    " Token of the TCP daemon at address, None if there is none or it is not private "
+    path = token_file(address)
+    try:
+        check_private(path)
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def parse_address(text):
+    " 'host:port' becomes a (host, port) pair, anything else is a socket path "
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit() and os.sep not in text:
+        return (host or '127.0.0.1', int(port))
+    return text
+
+def connect(address, timeout=0.5):
+    """ Connected socket, raises OSError if no daemon listens on address and
+        PermissionError if the socket belongs to another user
+    """
+    if not isinstance(address, tuple):
+        check_private(address)
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        # rendering may take longer than connecting
+        sock.settimeout(None)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def send_message(sock, header, payload=b''):
+    head = json.dumps(header).encode('utf-8')
+    sock.sendall(_LENGTHS.pack(len(head), len(payload)) + head + payload)
+
+def _receive(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError('connection closed after incomplete message')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def receive_message(sock):
+    " (header, payload) of the next message "
+    headSize, payloadSize = _LENGTHS.unpack(_receive(sock, _LENGTHS.size))
+    header = json.loads(_receive(sock, headSize).decode('utf-8'))
+    return header, _receive(sock, payloadSize)
+
+def render(args, document):
+    """ Run the effect with the command line arguments args on the SVG document (bytes).
+        Returns (exit status, output document, messages written to stderr).
+    """
+    import inkex
+    from sheet_metal_conus import SheetMetalConus
+    errors = io.StringIO()
+    output = io.BytesIO()
+    status = 0
+    effect = None
+    with redirect_stderr(errors):
+        try:
+            effect = SheetMetalConus()
+            effect.parse_arguments(args)
+            effect.options.input_file = io.BytesIO(document)
+            effect.options.output = output
+            effect.load_raw()
+            effect.save_raw(effect.effect())
+        except inkex.utils.AbortExtension as err:
+            # the same exit status as a run in process
+            sys.stderr.write(str(err) + '\n')
+            status = inkex.base.ABORT_STATUS
+        except SystemExit as err:
+            # argparse exits on invalid arguments
+            status = err.code if isinstance(err.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        finally:
+            if effect is not None:
+                effect.clean_up()
+    return status, output.getvalue(), errors.getvalue()
+
+class RenderHandler(socketserver.BaseRequestHandler):
+    " Renders the document of one request "
+    def handle(self):
+        try:
+            header, document = receive_message(self.request)
+        except (ConnectionError, ValueError):
+            return
+        token = self.server.token
+        if token is not None and not hmac.compare_digest(str(header.get('token', '')).encode('utf-8'), token.encode('utf-8')):
+            send_message(self.request, {'status': 1, 'stderr': 'Request refused, the daemon token does not match.\n'})
+            return
+        if header.get('ping'):
+            send_message(self.request, {'status': 0})
+            return
+        with self.server.renderLock:
+            # the environment and working directory are shared by all threads
+            if header.get('documentPath'):
+                os.environ['DOCUMENT_PATH'] = header['documentPath']
+            # relative paths in the arguments are meant from the directory of the client
+            cwd = os.getcwd()
+            try:
+                os.chdir(header.get('cwd') or cwd)
+            except OSError as err:
+                send_message(self.request, {'status': 1, 'stderr': 'Can not change to the working directory of the client: %s\n' % err})
+                return
+            try:
+                status, output, errors = render(header.get('args', []), document)
+            finally:
+                os.chdir(cwd)
+        send_message(self.request, {'status': status, 'stderr': errors}, output)
+
+# with fork() every request runs in a child of the warm process, otherwise in a thread
+_Concurrency = socketserver.ForkingMixIn if hasattr(os, 'fork') else socketserver.ThreadingMixIn
+
+class _RenderServer(_Concurrency):
+    daemon_threads = True
+    # stderr is redirected while rendering, so threads have to take turns;
+    # forked children each hold their own copy of the lock
+    renderLock = threading.Lock()
+    # secret clients have to send, only used over TCP
+    token = None
+
+if hasattr(socket, 'AF_UNIX'):
+    class UnixRenderServer(_RenderServer, socketserver.UnixStreamServer):
+        pass
+
+class TcpRenderServer(_RenderServer, socketserver.TCPServer):
+    allow_reuse_address = True
+
+def write_token(address):
+    " Create a new token for the TCP daemon at address, readable by the current user only "
+    make_private_dir(runtime_dir())
+    token = secrets.token_hex(32)
+    path = token_file(address)
+    if os.path.lexists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+    return token
+
+def make_server(address):
+    """ Listening server for a socket path or a (host, port) pair.
+        A TCP server gets a token, see write_token().
+    """
+    if isinstance(address, tuple):
+        server = TcpRenderServer(address, RenderHandler)
+        server.token = write_token(server.server_address)
+        return server
+    if os.path.dirname(address) == runtime_dir():
+        make_private_dir(runtime_dir())
+    try:
+        # a daemon that is still running keeps its socket
+        connect(address).close()
+        raise OSError('a daemon is already listening on %s' % address)
+    except (ConnectionError, FileNotFoundError, socket.timeout):
+        pass
+    if os.path.lexists(address):
+        # only a stale socket is removed, never any other file
+        if not stat.S_ISSOCK(os.lstat(address).st_mode):
+            raise OSError('%s exists and is not a socket' % address)
+        os.remove(address)
+    old = os.umask(0o077)
+    try:
+        return UnixRenderServer(address, RenderHandler)
+    finally:
+        os.umask(old)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep the Sheet Metal Conus extension loaded and render documents for sheet_metal_conus_client.py.')
+    parser.add_argument('--address', default=None, help='Unix socket path or host:port to listen on (default %s, or $%s).' % (default_address(), ADDRESS_VARIABLE))
+    args = parser.parse_args(argv)
+    address = parse_address(args.address) if args.address else default_address()
+    # load everything once, the children inherit the warm modules
+    import inkex
+    import sheet_metal_conus
+    try:
+        server = make_server(address)
+    except OSError as err:
+        sys.stderr.write('Can not listen on %s: %s\n' % (address, err))
+        return 1
+    # clean up the socket on kill as well
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    sys.stderr.write('Sheet Metal Conus daemon listening on %s\n' % (address,))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        if isinstance(address, tuple):
+            os.remove(token_file(server.server_address))
+        elif os.path.exists(address):
+            os.remove(address)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Streaming DXF and G-code export of unrolled cones.
+
+    The writers take the dictionaries filled in by calculate_cone() and write
+    LINE/ARC entities or G1/G2/G3 moves straight to a text stream, without
+    building SVG path strings or an XML tree first. Numbers are written with a
+    fixed number of decimals and no timestamps are added, so the same input
+    always gives the same bytes.
+
+    DXF and G-code have the y-axis pointing up, so the layout is mirrored to keep
+    the orientation of the SVG output.
+
+    Example:
+        with open('part.dxf', 'w', newline='\\n') as f, DxfWriter(f, 'mm') as dxf:
+            dxf.write_cone(dictCone)
+"""
+
+import math
+
+from sheet_metal_conus_geometry import flatten_arcs
+
+# G-code only knows mm (G21) and inches (G20), other units are converted to mm
+GCODE_UNITS = {'mm': ('G21', 1.0), 'cm': ('G21', 10.0), 'in': ('G20', 1.0),
+               'px': ('G21', 25.4/96.0), 'pt': ('G21', 25.4/72.0)}
+
+def format_number(value, precision):
+    " Fixed point representation without a negative zero "
+    text = '%.*f' % (precision, value)
+    if text.startswith('-') and not text.strip('-0.'):
+        text = text[1:]
+    return text
+
+def cone_contour(dictCone, dx=0.0, dy=0.0, tolerance=None):
+    """ Closed outline of the layout as a list of moves, mirrored to a y-up system
+        and shifted by (dx, dy) (given in the SVG orientation).
+        Every move is ('line', end) or ('arc', end, center, clockwise),
+        the contour starts at point A. With a tolerance the arcs are flattened
+        into line moves deviating at most tolerance from the true arcs.
+    """
+    def flip(p):
+        return (p[0] + dx, -(p[1] + dy))
+    if tolerance:
+        start = flip(dictCone['ptA'])
+        arcs = [(dictCone['longRadius'], 0.0, dictCone['angle'])]
+        if dictCone['shortRadius'] > 0:
+            arcs.append((dictCone['shortRadius'], dictCone['angle'], 0.0))
+        flattened = flatten_arcs(arcs, tolerance)
+        points = flattened[0].tolist()
+        if dictCone['shortRadius'] > 0:
+            points += flattened[1].tolist()
+        else:
+            points.append(dictCone['ptA'])
+        return start, [('line', flip(p)) for p in points]
+    center = flip((0.0, 0.0))
+    moves = [('line', flip(dictCone['ptB'])),
+             ('arc', flip(dictCone['ptC']), center, True),
+             ('line', flip(dictCone['ptD']))]
+    if dictCone['shortRadius'] > 0:
+        moves.append(('arc', flip(dictCone['ptA']), center, False))
+    return flip(dictCone['ptA']), moves
+
+class DxfWriter:
+    """ Writes an ASCII DXF (R12) file with one LINE or ARC entity per edge, or with
+        a tolerance one closed POLYLINE per layout with the arcs flattened.
+        Call close() (or use the writer as a context manager) to finish the file.
+        R12 has no header variable for the drawing units ($INSUNITS and $MEASUREMENT
+        came later), the coordinates are written in the given units as they are.
+    """
+    def __init__(self, stream, units='mm', precision=6, layer='0', tolerance=None):
+        self.stream = stream
+        self.precision = precision
+        self.layer = layer
+        self.tolerance = tolerance
+        stream.write('0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n'
+                     '0\nSECTION\n2\nENTITIES\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _num(self, value):
+        return format_number(value, self.precision)
+
+    def write_cone(self, dictCone, dx=0.0, dy=0.0, name=None):
+        """ LINE and ARC entities of one layout shifted by (dx, dy).
+            name is accepted for symmetry with GcodeWriter, R12 entities can not carry it.
+        """
+        write = self.stream.write
+        start, moves = cone_contour(dictCone, dx, dy, self.tolerance)
+        if self.tolerance:
+            # one closed POLYLINE, the last move returns to the start point
+            write('0\nPOLYLINE\n8\n%s\n66\n1\n70\n1\n10\n0.0\n20\n0.0\n' % self.layer)
+            for point in [start] + [move[1] for move in moves[:-1]]:
+                write('0\nVERTEX\n8\n%s\n10\n%s\n20\n%s\n' % (self.layer, self._num(point[0]), self._num(point[1])))
+            write('0\nSEQEND\n8\n%s\n' % self.layer)
+            return
+        for move in moves:
+            end = move[1]
+            if move[0] == 'line':
+                write('0\nLINE\n8\n%s\n10\n%s\n20\n%s\n11\n%s\n21\n%s\n'
+                      % (self.layer, self._num(start[0]), self._num(start[1]), self._num(end[0]), self._num(end[1])))
+            else:
+                center = move[2]
+                # DXF arcs always run counterclockwise from start to end angle
+                first, last = (end, start) if move[3] else (start, end)
+                startAngle = math.degrees(math.atan2(first[1] - center[1], first[0] - center[0])) % 360.0
+                endAngle = math.degrees(math.atan2(last[1] - center[1], last[0] - center[0])) % 360.0
+                radius = math.hypot(start[0] - center[0], start[1] - center[1])
+                write('0\nARC\n8\n%s\n10\n%s\n20\n%s\n40\n%s\n50\n%s\n51\n%s\n'
+                      % (self.layer, self._num(center[0]), self._num(center[1]), self._num(radius),
+                         self._num(startAngle), self._num(endAngle)))
+            start = end
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.write('0\nENDSEC\n0\nEOF\n')
+            self.stream = None
+
+class GcodeWriter:
+    """ Writes a G-code program cutting every layout as one closed contour:
+        rapid move to point A, tool on, G1 lines and G2/G3 arcs with I/J
+        center offsets, tool off. With a tolerance the arcs are flattened into
+        G1 moves for controllers without circular interpolation.
+        Call close() (or use the writer as a context manager) to finish the program.
+    """
+    def __init__(self, stream, units='mm', precision=4, feed=1000.0, toolOn='M3', toolOff='M5', tolerance=None):
+        self.stream = stream
+        self.tolerance = tolerance
+        self.precision = precision
+        self.toolOn = toolOn
+        self.toolOff = toolOff
+        code, self.scale = GCODE_UNITS[units]
+        stream.write('(Sheet Metal Conus)\n%s\nG90\nG17\nF%s\n' % (code, format_number(feed, precision)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _xy(self, p):
+        return 'X%s Y%s' % (format_number(p[0] * self.scale, self.precision),
+                            format_number(p[1] * self.scale, self.precision))
+
+    def write_cone(self, dictCone, dx=0.0, dy=0.0, name=None):
+        " Cutting moves of one layout shifted by (dx, dy) "
+        write = self.stream.write
+        start, moves = cone_contour(dictCone, dx, dy, self.tolerance)
+        if name:
+            write('(%s)\n' % name.replace('(', '[').replace(')', ']'))
+        write('G0 %s\n%s\n' % (self._xy(start), self.toolOn))
+        for move in moves:
+            end = move[1]
+            if move[0] == 'line':
+                write('G1 %s\n' % self._xy(end))
+            else:
+                center = move[2]
+                write('%s %s I%s J%s\n' % ('G2' if move[3] else 'G3', self._xy(end),
+                                           format_number((center[0] - start[0]) * self.scale, self.precision),
+                                           format_number((center[1] - start[1]) * self.scale, self.precision)))
+            start = end
+        write('%s\n' % self.toolOff)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.write('M2\n')
+            self.stream = None
+
+# writer class per output format, the key is also used as file extension
+EXPORTERS = {'dxf': DxfWriter, 'gcode': GcodeWriter}
@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Geometry of the Sheet Metal Conus extension.
+
+    Everything needed to unroll a cone or frustum and to describe its outline as
+    SVG path data. Only the standard library is imported at load time (NumPy is
+    loaded on the first call of a vectorized function like calculate_cones()),
+    so this module can be used without Inkscape, inkex or lxml.
+"""
+
+import math
+
+# Helper functions
+def calc_angle_between_points(p1, p2):
+    xDiff = p2[0] - p1[0]
+    yDiff = p2[1] - p1[1]
+    return math.degrees(math.atan2(yDiff, xDiff))
+
+def calc_dist_between_points(p1, p2):
+    xDiff = p2[0] - p1[0]
+    yDiff = p2[1] - p1[1]
+    return math.sqrt(yDiff*yDiff + xDiff*xDiff)
+
+def normalize(p1, p2):
+    " p1,p2 defines a vector return normalized "
+    xDiff = p2[0] - p1[0]
+    yDiff = p2[1] - p1[1]
+    magn = calc_dist_between_points(p1,p2)
+    return (xDiff/magn, yDiff/magn)
+
+def polar_to_cartesian(cx, cy, radius, angle_degrees):
+    " So we can make arcs in the 'A' svg syntax. "
+    angle_radians = math.radians(angle_degrees)
+    return [
+	          cx + (radius * math.cos(angle_radians)), 
+			  cy + (radius * math.sin(angle_radians))
+		    ]
+
+def point_on_circle(radius, angle):
+    " return xy coord of the point at distance radius from origin at angle "
+    x = radius * math.cos(angle)
+    y = radius * math.sin(angle)
+    return [x, y]
+
+def sector_bounding_box(shortRadius, longRadius, angle, start=0.0):
+    """ Bounding box (xmin, ymin, xmax, ymax) of the unrolled annular sector
+        between shortRadius and longRadius spanning angle radians from the
+        direction start (default the x-axis).
+    """
+    end = start + angle
+    points = [point_on_circle(shortRadius, start), point_on_circle(longRadius, start),
+              point_on_circle(longRadius, end), point_on_circle(shortRadius, end)]
+    # the outer arc bulges past its endpoints wherever it crosses an axis
+    quadrant = (math.floor(start / (math.pi / 2)) + 1) * math.pi / 2
+    while quadrant < end:
+        points.append(point_on_circle(longRadius, quadrant))
+        quadrant += math.pi / 2
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+# Field layout of the structured array returned by calculate_cones()
+CONE_FIELDS = [('diaBase',     'f8'),
+               ('diaCut',      'f8'),
+               ('heightCone',  'f8'),
+               ('shortRadius', 'f8'),
+               ('longRadius',  'f8'),
+               ('angle',       'f8'),
+               ('chordBase',   'f8'),
+               ('chordCut',    'f8'),
+               ('ptA',         'f8', (2,)),
+               ('ptB',         'f8', (2,)),
+               ('ptC',         'f8', (2,)),
+               ('ptD',         'f8', (2,))]
+
+def calculate_cones(diaBase, diaCut, heightCone):
+    """ Vectorized counterpart of calculate_cone().
+        Takes array-likes (or scalars) of base diameters, cut diameters and heights,
+        broadcasts them against each other and solves all cones in one pass.
+        Returns a masked structured array with the fields of CONE_DTYPE and the
+        broadcast shape of the inputs (one dimensional with one cone for scalars).
+        Rows that can not be unrolled (diaCut >= diaBase, zero height, negative
+        or non finite input) are masked instead of raising.
+    """
+    import numpy as np
+    CONE_DTYPE = np.dtype(CONE_FIELDS)
+    dBase, dCut, hCone = np.broadcast_arrays(np.atleast_1d(np.asarray(diaBase, dtype=float)),
+                                             np.atleast_1d(np.asarray(diaCut, dtype=float)),
+                                             np.atleast_1d(np.asarray(heightCone, dtype=float)))
+    # solved as one flat row of cones, the result gets the broadcast shape back
+    shape = dBase.shape
+    dBase = dBase.ravel()
+    dCut = dCut.ravel()
+    hCone = hCone.ravel()
+    valid = (np.isfinite(dBase) & np.isfinite(dCut) & np.isfinite(hCone) &
+             (dCut >= 0) & (dCut < dBase) & (hCone > 0))
+
+    cones = np.zeros(dBase.shape, dtype=CONE_DTYPE)
+    cones['diaBase'] = dBase
+    cones['diaCut'] = dCut
+    cones['heightCone'] = hCone
+    with np.errstate(all='ignore'):
+        base = dBase - dCut
+        # same operation order as calculate_cone() so results match bit for bit
+        shortRadius = np.where(dCut > 0,
+                               np.sqrt( dCut*dCut/4 + (dCut*hCone)/base * (dCut*hCone)/base ),
+                               0.0)
+        longRadius = np.sqrt( dBase*dBase/4 + (dBase*hCone)/base * (dBase*hCone)/base )
+        angle = (np.pi * dBase) / longRadius
+        cosAngle = np.cos(angle)
+        sinAngle = np.sin(angle)
+        chordFactor = np.sqrt( 2* (1-cosAngle) )
+        cones['shortRadius'] = shortRadius
+        cones['longRadius'] = longRadius
+        cones['angle'] = angle
+        cones['chordBase'] = longRadius * chordFactor
+        cones['chordCut'] = shortRadius * chordFactor
+        cones['ptA'][:, 0] = shortRadius
+        cones['ptB'][:, 0] = longRadius
+        cones['ptC'][:, 0] = longRadius * cosAngle
+        cones['ptC'][:, 1] = longRadius * sinAngle
+        cones['ptD'][:, 0] = shortRadius * cosAngle
+        cones['ptD'][:, 1] = shortRadius * sinAngle
+
+    result = np.ma.masked_array(cones, mask=np.zeros(cones.shape, np.ma.make_mask_descr(CONE_DTYPE)))
+    result[~valid] = np.ma.masked
+    return result.reshape(shape)
+
+def cone_to_dict(cone):
+    """ Convert one row of calculate_cones() into the dictionary layout
+        filled in by calculate_cone().
+    """
+    dictCone = {}
+    for field in CONE_FIELDS:
+        name = field[0]
+        value = cone[name]
+        if name.startswith('pt'):
+            dictCone[name] = (float(value[0]), float(value[1]))
+        else:
+            dictCone[name] = float(value)
+    return dictCone
+
+def calculate_cone(dictCone):
+    """ Calculates all relevant values in order to construct a cone.
+        These values are:
+        - short radius
+        - long radius
+        - angle of cone layout
+        - chord of base diameter
+        - chord of cut diameter
+        - coordinates of points A, B, C and D
+    """        
+    dBase = dictCone['diaBase']
+    dCut =  dictCone['diaCut']
+    hCone = dictCone['heightCone']
+    base = dBase - dCut
+    # radius from top of cone to cut
+    if dCut > 0:
+        shortRadius = math.sqrt( dCut*dCut/4 + (dCut*hCone)/base * (dCut*hCone)/base )
+    else:
+        shortRadius=0.0
+    dictCone['shortRadius'] = shortRadius
+    ## radius from top of cone to base of cone
+    longRadius=math.sqrt( dBase*dBase/4 + (dBase*hCone)/base * (dBase*hCone)/base )
+    dictCone['longRadius'] = longRadius
+
+    ## angle of circle sector
+    angle=(math.pi * dBase) / longRadius
+    dictCone['angle'] = angle
+    # chord is the straight line between the 2 endpoints of an arc. 
+    # Not used directly, but available in verbose output.
+    chordBase = longRadius * math.sqrt( 2* (1-math.cos(angle)) )
+    dictCone['chordBase'] = chordBase
+    chordCut = shortRadius * math.sqrt( 2* (1-math.cos(angle)) )
+    dictCone['chordCut'] = chordCut
+
+    # calculate coordinates of points A, B, C and D
+    # center M is at (0,0) and points A and B are on the x-axis:
+    ptA = (shortRadius, 0.0)
+    ptB = (longRadius,  0.0)
+    # we can calculate points C and D with the given radii and the calculated angle
+    ptC=(longRadius * math.cos(angle),  longRadius *  math.sin(angle))
+    ptD=(shortRadius * math.cos(angle), shortRadius * math.sin(angle))
+    dictCone['ptA'] = ptA
+    dictCone['ptB'] = ptB
+    dictCone['ptC'] = ptC
+    dictCone['ptD'] = ptD
+
+def build_cone_path(dictCone, convFactor, tolerance=None, precision=None):
+    """ Connect the points into a single path of lines and arcs.
+        With a tolerance the arcs are flattened, see build_cone_polyline().
+        With a precision the outline is written as one compact closed contour,
+        see compact_path().
+    """
+    if precision is not None:
+        return compact_path(*cone_outline(dictCone, tolerance), convFactor, precision)
+    if tolerance:
+        return build_cone_polyline(dictCone, convFactor, tolerance)
+    zeroCenter=(0.0, 0.0)
+    angle = math.degrees(dictCone['angle'])
+    path = ""
+    path += build_line(dictCone['ptA'][0], dictCone['ptA'][1], dictCone['ptB'][0], dictCone['ptB'][1], convFactor) # A,B
+    path += " " + build_arc(zeroCenter[0], zeroCenter[1], 0.0, angle, dictCone.get('longRadius')*convFactor)
+    path += " " + build_line(dictCone['ptC'][0], dictCone['ptC'][1],dictCone['ptD'][0], dictCone['ptD'][1], convFactor) # C,D
+    path += build_arc(zeroCenter[0], zeroCenter[1], 0.0, angle, dictCone['shortRadius']*convFactor)
+    return path
+
+def build_arc(x, y, start_angle, end_angle, radius, reverse=True, swap=False):
+    # Not using internal arc rep - instead construct path A in svg style directly
+    # so we can append lines to make single path
+    start = polar_to_cartesian(x, y, radius, end_angle)
+    end = polar_to_cartesian(x, y, radius, start_angle)
+    arc_flag = 0 if reverse else 1
+    sweep = 0 if (end_angle-start_angle) <=180 else 1
+    if swap: sweep = 1-sweep
+    path = 'M %s,%s' % (start[0], start[1])
+    path += " A %s,%s 0 %d %d %s %s" % (radius, radius, sweep, arc_flag, end[0], end[1])
+    return path
+
+def build_line(x1, y1, x2, y2, unitFactor):
+    path = 'M %s,%s L %s,%s' % (x1*unitFactor, y1*unitFactor, x2*unitFactor, y2*unitFactor)
+    return path
+
+# Flattening: polylines instead of arcs for cutters that can not handle arcs
+def arc_segment_count(radius, angle, tolerance):
+    """ Smallest number of equal chords approximating an arc of radius spanning
+        angle radians so that no chord deviates more than tolerance from the arc.
+        A chord over the angle step has the sagitta radius*(1-cos(step/2)), solved
+        for step in a form that stays accurate for huge radii.
+    """
+    if radius <= 0 or angle <= 0:
+        return 1
+    step = 4 * math.asin(math.sqrt(min(0.5, tolerance / (2*radius))))
+    return max(1, int(math.ceil(angle / step - 1e-9)))
+
+def flatten_arcs(arcs, tolerance):
+    """ Vertices of several arcs around the origin, computed in one vectorized pass.
+        arcs is a list of (radius, startAngle, endAngle) in radians. Returns one
+        array of shape (count+1, 2) per arc, evenly spaced from start to end angle
+        with both end points included and count from arc_segment_count().
+    """
+    import numpy as np
+    counts = np.array([arc_segment_count(radius, abs(end - start), tolerance) for radius, start, end in arcs])
+    sizes = counts + 1
+    arc = np.repeat(np.arange(len(arcs)), sizes)
+    step = np.arange(arc.size) - (np.cumsum(sizes) - sizes)[arc]
+    radius, start, end = (np.array(column, dtype=float)[arc] for column in zip(*arcs))
+    # step/count is exactly 1.0 for the last vertex, so arcs end exactly at their end angle
+    t = start + (end - start) * (step / counts[arc])
+    points = np.column_stack((radius * np.cos(t), radius * np.sin(t)))
+    return np.split(points, np.cumsum(sizes)[:-1])
+
+def build_cone_polyline(dictCone, convFactor, tolerance):
+    """ Closed outline of the layout with lines only: the base and cut arcs are
+        replaced by the fewest evenly spaced chords that deviate at most tolerance
+        (in units of the cone) from the true arcs.
+    """
+    return absolute_path(*cone_outline(dictCone, tolerance), convFactor)
+
+# Outlines: closed contours as a start point and a list of segments
+def cone_outline(dictCone, tolerance=None):
+    """ Closed outline of the layout starting at point A, as (start, segments).
+        Every segment is ('L', end) or ('A', radius, largeArc, sweep, end) with the
+        SVG arc flags. With a tolerance the arcs are flattened into lines.
+    """
+    angle = dictCone['angle']
+    shortRadius = dictCone['shortRadius']
+    longRadius = dictCone['longRadius']
+    if tolerance:
+        arcs = [(longRadius, 0.0, angle)]
+        if shortRadius > 0:
+            arcs.append((shortRadius, angle, 0.0))
+        flattened = flatten_arcs(arcs, tolerance)
+        # A, the base arc from B to C, then the cut arc from D back to A (or the tip)
+        points = flattened[0].tolist()
+        if shortRadius > 0:
+            points += flattened[1][:-1].tolist()
+        return dictCone['ptA'], [('L', p) for p in points]
+    large = 1 if angle > math.pi else 0
+    segments = [('L', dictCone['ptB']),
+                ('A', longRadius, large, 1, dictCone['ptC']),
+                ('L', dictCone['ptD'])]
+    if shortRadius > 0:
+        segments.append(('A', shortRadius, large, 0, dictCone['ptA']))
+    return dictCone['ptA'], segments
+
+def absolute_path(start, segments, convFactor):
+    " Closed SVG path of an outline with absolute coordinates at full precision "
+    def xy(p):
+        return '%s,%s' % (p[0]*convFactor, p[1]*convFactor)
+    path = 'M ' + xy(start)
+    for segment in segments:
+        if segment[0] == 'L':
+            path += ' L ' + xy(segment[1])
+        else:
+            radius = segment[1]*convFactor
+            path += ' A %s,%s 0 %d %d %s' % (radius, radius, segment[2], segment[3], xy(segment[4]))
+    return path + ' Z'
+
+# Coordinates closer than this (in units) to the exact value are good enough for cutting
+UNIT_TOLERANCE = {'mm': 0.001, 'cm': 0.0001, 'in': 0.00005, 'px': 0.01, 'pt': 0.01}
+
+def path_precision(units, convFactor=1.0, tolerance=None):
+    """ Number of decimals for path coordinates in user units (convFactor user units
+        per unit) so that rounding moves no point by more than tolerance units
+        (default UNIT_TOLERANCE of units).
+    """
+    if tolerance is None:
+        tolerance = UNIT_TOLERANCE.get(units, 0.001)
+    return max(0, int(math.ceil(math.log10(0.5 / (tolerance * convFactor)) - 1e-9)))
+
+class PathWriter:
+    """ Writes compact SVG path data: relative commands, numbers rounded to
+        precision decimals without trailing zeros, repeated commands merged and
+        h/v for axis parallel lines. Positions are tracked as rounded integers,
+        so relative steps never accumulate rounding errors: every point stays
+        within half a unit of the last decimal of its exact position.
+    """
+    def __init__(self, precision, convFactor=1.0):
+        self.precision = precision
+        self.scale = 10 ** precision
+        self.convFactor = convFactor
+        self.parts = []
+        self.command = None
+        self.current = (0, 0)
+        self.start = (0, 0)
+
+    def _quantize(self, p):
+        factor = self.convFactor * self.scale
+        return (int(round(p[0] * factor)), int(round(p[1] * factor)))
+
+    def _number(self, value):
+        " Integer number of the last decimal as text "
+        if self.precision == 0 or value == 0:
+            return str(value)
+        whole, fraction = divmod(abs(value), self.scale)
+        text = ('%d.%0*d' % (whole, self.precision, fraction)).rstrip('0').rstrip('.')
+        return ('-' if value < 0 else '') + text
+
+    def _emit(self, command, values):
+        text = ''
+        for value in values:
+            number = self._number(value)
+            # no separator needed in front of a sign
+            text += number if not text or number[0] == '-' else ' ' + number
+        if command == self.command and text and text[0] != '-':
+            text = ' ' + text
+        elif command != self.command:
+            text = command + text
+        self.parts.append(text)
+        self.command = command
+
+    def moveTo(self, p):
+        q = self._quantize(p)
+        if self.parts:
+            self._emit('m', (q[0] - self.current[0], q[1] - self.current[1]))
+        else:
+            self._emit('M', q)
+        # the next command always gets its letter
+        self.command = None
+        self.current = self.start = q
+
+    def lineTo(self, p):
+        q = self._quantize(p)
+        dx, dy = q[0] - self.current[0], q[1] - self.current[1]
+        if dx == 0 and dy == 0:
+            return
+        if dy == 0:
+            self._emit('h', (dx,))
+        elif dx == 0:
+            self._emit('v', (dy,))
+        else:
+            self._emit('l', (dx, dy))
+        self.current = q
+
+    def arcTo(self, radius, largeArc, sweep, p):
+        q = self._quantize(p)
+        r = int(round(radius * self.convFactor * self.scale))
+        self._emit('a', (r, r, 0, largeArc * self.scale, sweep * self.scale,
+                         q[0] - self.current[0], q[1] - self.current[1]))
+        self.current = q
+
+    def close(self):
+        self._emit('z', ())
+        self.current = self.start
+
+    def path(self):
+        return ''.join(self.parts)
+
+def compact_path(start, segments, convFactor, precision):
+    " Closed outline as one compact relative subpath, see PathWriter "
+    writer = PathWriter(precision, convFactor)
+    writer.moveTo(start)
+    for segment in segments:
+        if segment[0] == 'L':
+            writer.lineTo(segment[1])
+        else:
+            writer.arcTo(segment[1], segment[2], segment[3], segment[4])
+    writer.close()
+    return writer.path()
+
+# Gores: cones too large for one sheet are split into equal sub-sectors
+def gore_cone(dictCone, count):
+    """ Returns the dictionary of one of count equal gores of the layout,
+        laid out like a cone of its own (points A and B on the x-axis).
+    """
+    gore = dict(dictCone)
+    angle = dictCone['angle'] / count
+    shortRadius = dictCone['shortRadius']
+    longRadius = dictCone['longRadius']
+    gore['gores'] = count
+    gore['angle'] = angle
+    gore['chordBase'] = longRadius * math.sqrt( 2* (1-math.cos(angle)) )
+    gore['chordCut'] = shortRadius * math.sqrt( 2* (1-math.cos(angle)) )
+    gore['ptC'] = (longRadius * math.cos(angle),  longRadius *  math.sin(angle))
+    gore['ptD'] = (shortRadius * math.cos(angle), shortRadius * math.sin(angle))
+    return gore
+
+def gore_edges(shortRadius, longRadius, angle, seam=0.0, tabs=0):
+    """ Polylines of the two radial edges of a gore, from A to B and from C to D.
+        seam adds a strip of that width (with 45 degree corners) outside the edges.
+        With tabs > 0 the second edge gets that many joggle tabs of depth seam
+        instead of a continuous strip.
+    """
+    length = longRadius - shortRadius
+    first = [(shortRadius, 0.0), (longRadius, 0.0)]
+    direction = (math.cos(angle), math.sin(angle))
+    normal = (-direction[1], direction[0])
+    def on_second(radius, offset):
+        return (radius*direction[0] + offset*normal[0], radius*direction[1] + offset*normal[1])
+    second = [on_second(longRadius, 0.0), on_second(shortRadius, 0.0)]
+    if seam <= 0:
+        return first, second
+    chamfer = min(seam, length / 4)
+    first[1:1] = [(shortRadius + chamfer, -seam), (longRadius - chamfer, -seam)]
+    if tabs <= 0:
+        second[1:1] = [on_second(longRadius - chamfer, seam), on_second(shortRadius + chamfer, seam)]
+        return first, second
+    # tabs and gaps alternate, starting and ending with a gap
+    step = length / (2*tabs + 1)
+    chamfer = min(seam, step / 4)
+    points = [second[0]]
+    for tab in range(tabs):
+        outer = longRadius - (2*tab + 1) * step
+        inner = outer - step
+        points += [on_second(outer, 0.0), on_second(outer - chamfer, seam),
+                   on_second(inner + chamfer, seam), on_second(inner, 0.0)]
+    points.append(second[1])
+    return first, points
+
+def gore_bounding_box(gore, seam=0.0, tabs=0, rotation=0.0):
+    " Bounding box of a gore with its seam allowance after turning it by rotation radians "
+    first, second = gore_edges(gore['shortRadius'], gore['longRadius'], gore['angle'], seam, tabs)
+    c, s = math.cos(rotation), math.sin(rotation)
+    xmin, ymin, xmax, ymax = sector_bounding_box(gore['shortRadius'], gore['longRadius'], gore['angle'], rotation)
+    for x, y in first + second:
+        xr = x*c - y*s
+        yr = x*s + y*c
+        xmin, ymin = min(xmin, xr), min(ymin, yr)
+        xmax, ymax = max(xmax, xr), max(ymax, yr)
+    return (xmin, ymin, xmax, ymax)
+
+def gore_fits(gore, sheetWidth, sheetHeight, seam=0.0, tabs=0):
+    " True if the gore fits the sheet with its bisector along one of the sheet edges "
+    for rotation in (-gore['angle']/2, math.pi/2 - gore['angle']/2):
+        xmin, ymin, xmax, ymax = gore_bounding_box(gore, seam, tabs, rotation)
+        if xmax - xmin <= sheetWidth and ymax - ymin <= sheetHeight:
+            return True
+    return False
+
+def calculate_gore_count(dictCone, sheetWidth, sheetHeight, seam=0.0, tabs=0, maxCount=1024):
+    """ Smallest number of equal gores the layout has to be split into so that
+        every gore fits a sheet of the given size, or None if no number up to
+        maxCount does (the sheet is shorter than the slant height).
+        Gores only get smaller with a larger count, so the count is found by
+        doubling followed by bisection instead of trying every number.
+    """
+    def fits(count):
+        return gore_fits(gore_cone(dictCone, count), sheetWidth, sheetHeight, seam, tabs)
+    if fits(1):
+        return 1
+    low, high = 1, 2
+    while not fits(high):
+        if high >= maxCount:
+            return None
+        low, high = high, min(2*high, maxCount)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if fits(middle):
+            high = middle
+        else:
+            low = middle
+    return high
+
+def gore_outline(gore, seam=0.0, tabs=0, tolerance=None):
+    """ Closed outline of one gore as (start, segments) like cone_outline():
+        first edge, outer arc, second edge and inner arc.
+    """
+    shortRadius = gore['shortRadius']
+    longRadius = gore['longRadius']
+    first, second = gore_edges(shortRadius, longRadius, gore['angle'], seam, tabs)
+    segments = [('L', p) for p in first[1:]]
+    if tolerance:
+        arcs = [(longRadius, 0.0, gore['angle'])]
+        if shortRadius > 0:
+            arcs.append((shortRadius, gore['angle'], 0.0))
+        flattened = flatten_arcs(arcs, tolerance)
+        points = flattened[0][1:-1].tolist() + second
+        if shortRadius > 0:
+            points += flattened[1][1:-1].tolist()
+        return first[0], segments + [('L', p) for p in points]
+    large = 1 if gore['angle'] > math.pi else 0
+    segments.append(('A', longRadius, large, 1, second[0]))
+    segments += [('L', p) for p in second[1:]]
+    if shortRadius > 0:
+        segments.append(('A', shortRadius, large, 0, first[0]))
+    return first[0], segments
+
+def build_gore_path(gore, convFactor, seam=0.0, tabs=0, tolerance=None, precision=None):
+    """ Closed path of one gore: first edge, outer arc, second edge and inner arc.
+        With a tolerance the arcs are flattened like in build_cone_polyline(),
+        with a precision the path is written compact, see compact_path().
+    """
+    outline = gore_outline(gore, seam, tabs, tolerance)
+    if precision is not None:
+        return compact_path(*outline, convFactor, precision)
+    return absolute_path(*outline, convFactor)
+
+# Oblique cones: the apex (or the center of the cut) is not above the center of the base
+def oblique_true_lengths(radius, apexOffset, apexHeight, count):
+    """ True lengths of the count+1 generatrices from the apex to evenly spaced
+        points of the base circle, computed in one vectorized pass. The first (and
+        last) one points to the side the apex leans to, so it is the shortest.
+    """
+    import numpy as np
+    return generatrix_lengths(radius, apexOffset, apexHeight, np.linspace(0.0, 2*math.pi, count + 1))
+
+def generatrix_lengths(radius, apexOffset, apexHeight, theta):
+    " True lengths of the generatrices to the points of the base circle at the angles theta (array) "
+    import numpy as np
+    dx = radius * np.cos(theta) - apexOffset
+    dy = radius * np.sin(theta)
+    return np.sqrt(dx*dx + dy*dy + apexHeight*apexHeight)
+
+def develop_generatrices(lengths, chord):
+    """ Unrolled angles of the generatrices by triangulation: two neighbouring
+        generatrices and the base chord between them form a triangle, the triangles
+        are laid out next to each other around the apex. The angle at the apex is
+        taken from the half angle form of the law of cosines, which stays accurate
+        for the thin triangles of many generatrices.
+    """
+    import numpy as np
+    a = lengths[:-1]
+    b = lengths[1:]
+    half = np.sqrt(np.clip((chord - a + b) * (chord + a - b) / (4*a*b), 0.0, 1.0))
+    return np.concatenate(([0.0], np.cumsum(2 * np.arcsin(half))))
+
+def calculate_oblique_cone(dictCone, tolerance=0.01, minCount=16, maxCount=65536):
+    """ Develops an oblique cone or frustum by triangulation. Besides diaBase, diaCut
+        and heightCone dictCone holds the offset of the center of the cut (or of the
+        apex of an uncut cone) from the center of the base, parallel to the base.
+        The number of generatrices is doubled until the developed base and cut
+        curves are shorter than the true circumferences by at most tolerance.
+        The chord polygon does not depend on the apex, so this error is known
+        before the true lengths are computed in a single pass.
+        These values are added:
+        - apex height and apex offset
+        - number of generatrices and remaining perimeter error
+        - true lengths of all generatrices, the first one is the seam
+        - angle of the developed layout
+        - flat points of the base and cut curves (the apex is at (0,0))
+    """
+    import numpy as np
+    radius = dictCone['diaBase'] / 2
+    cutRadius = dictCone['diaCut'] / 2
+    height = dictCone['heightCone']
+    if not (radius > 0 and height > 0 and 0 <= cutRadius < radius):
+        raise ValueError('an oblique cone needs a base larger than its cut and a positive height')
+    # the generatrices of the frustum meet in the apex of the whole cone
+    scale = radius / (radius - cutRadius)
+    apexHeight = height * scale
+    # a negative offset mirrors the cone, which has the same development, so the
+    # first generatrix (the seam) is always on the side the apex leans to
+    apexOffset = abs(dictCone['offset']) * scale
+
+    circumference = 2*math.pi * (radius + cutRadius)
+    count = minCount
+    while True:
+        error = circumference - count * 2*math.sin(math.pi / count) * (radius + cutRadius)
+        if error <= tolerance or count >= maxCount:
+            break
+        count *= 2
+
+    lengths = oblique_true_lengths(radius, apexOffset, apexHeight, count)
+    angles = develop_generatrices(lengths, 2*radius*math.sin(math.pi / count))
+    basePoints = np.column_stack((lengths * np.cos(angles), lengths * np.sin(angles)))
+    dictCone['apexHeight'] = apexHeight
+    dictCone['apexOffset'] = apexOffset
+    dictCone['generatrices'] = count
+    dictCone['perimeterError'] = error
+    dictCone['trueLengths'] = lengths.tolist()
+    dictCone['angle'] = float(angles[-1])
+    dictCone['basePoints'] = basePoints.tolist()
+    # the cut is parallel to the base, so it divides all generatrices in the same ratio
+    dictCone['cutPoints'] = (basePoints * (cutRadius / radius)).tolist() if cutRadius > 0 else []
+    return dictCone
+
+def oblique_outline(dictCone):
+    """ Closed outline of a developed oblique cone as (start, segments) like
+        cone_outline(): seam on the cut, base curve, seam and cut curve back.
+    """
+    cutPoints = dictCone['cutPoints']
+    segments = [('L', tuple(p)) for p in dictCone['basePoints']]
+    if not cutPoints:
+        return (0.0, 0.0), segments
+    segments += [('L', tuple(p)) for p in reversed(cutPoints[1:])]
+    return tuple(cutPoints[0]), segments
+
+def build_oblique_path(dictCone, convFactor, precision=None):
+    " Closed path of a developed oblique cone, compact with a precision, see compact_path() "
+    outline = oblique_outline(dictCone)
+    if precision is not None:
+        return compact_path(*outline, convFactor, precision)
+    return absolute_path(*outline, convFactor)
+
+# Bend lines: radial lines between cut and base along which large cones are press brake formed
+def bend_lines(dictCone, count, adaptive=False):
+    """ Inner and outer end points of count bend lines of a solved cone (right or
+        oblique) as two arrays of shape (count, 2), computed in one batched pass.
+        The layout is split into count equal shares with a bend line in the middle
+        of each, so the seam lies halfway between the first and the last bend.
+        Evenly spaced lines divide the base arc equally. Adaptive lines divide the
+        rotation of the surface normal around the cone equally instead, so every
+        bend needs the same angle on the press brake; on an oblique cone they get
+        denser on the side the apex leans to. A right cone bends uniformly, there
+        both spacings are the same.
+    """
+    import numpy as np
+    share = (np.arange(count) + 0.5) / count
+    if 'basePoints' not in dictCone:
+        phi = dictCone['angle'] * share
+        direction = np.column_stack((np.cos(phi), np.sin(phi)))
+        return direction * dictCone['shortRadius'], direction * dictCone['longRadius']
+    radius = dictCone['diaBase'] / 2
+    apexOffset = dictCone['apexOffset']
+    apexHeight = dictCone['apexHeight']
+    base = np.asarray(dictCone['basePoints'])
+    theta = np.linspace(0.0, 2*math.pi, len(base))
+    if adaptive:
+        # surface normal along the base circle: tangent of the circle x generatrix
+        normals = np.column_stack((apexHeight * np.cos(theta), apexHeight * np.sin(theta),
+                                   radius - apexOffset * np.cos(theta)))
+        normals /= np.linalg.norm(normals, axis=1)[:, None]
+        steps = 2 * np.arcsin(np.clip(np.linalg.norm(np.diff(normals, axis=0), axis=1) / 2, 0.0, 1.0))
+        turning = np.concatenate(([0.0], np.cumsum(steps)))
+        bendTheta = np.interp(turning[-1] * share, turning, theta)
+    else:
+        bendTheta = 2*math.pi * share
+    # unrolled direction of the generatrices, interpolated between the developed ones
+    flat = np.unwrap(np.arctan2(base[:, 1], base[:, 0]))
+    phi = np.interp(bendTheta, np.linspace(0.0, 2*math.pi, len(base)), flat)
+    lengths = generatrix_lengths(radius, apexOffset, apexHeight, bendTheta)
+    outer = np.column_stack((np.cos(phi), np.sin(phi))) * lengths[:, None]
+    return outer * (dictCone['diaCut'] / dictCone['diaBase']), outer
+
+def build_bend_path(inner, outer, convFactor, precision=None):
+    """ All bend lines as one compound path of separate lines. Every second line is
+        drawn from outside in, so a plotter travels only along the arcs between them.
+        With a precision the path is written compact, see PathWriter.
+    """
+    lines = [(a, b) if index % 2 == 0 else (b, a) for index, (a, b) in enumerate(zip(inner.tolist(), outer.tolist()))]
+    if precision is not None:
+        writer = PathWriter(precision, convFactor)
+        for start, end in lines:
+            writer.moveTo(start)
+            writer.lineTo(end)
+        return writer.path()
+    return ' '.join('M %s,%s L %s,%s' % (start[0]*convFactor, start[1]*convFactor, end[0]*convFactor, end[1]*convFactor)
+                    for start, end in lines)
+
+def __getattr__(name):
+    # CONE_DTYPE is built on first access so that importing this module stays cheap
+    if name == 'CONE_DTYPE':
+        import numpy as np
+        return np.dtype(CONE_FIELDS)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
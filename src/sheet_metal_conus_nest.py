@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Nesting of many unrolled cone blanks onto stock sheets.
+
+    Every blank (an annular sector) is approximated by an enclosing polygon and
+    placed with a bottom-left heuristic: candidate positions next to the parts
+    already on a sheet and inside the unused inner radius of larger blanks are
+    tried for several rotations, the first free one is slid down and left as far
+    as possible, and the placement with the lowest top edge wins.
+    Candidate positions are kept per sheet and dropped once a part covers them,
+    a coarse occupancy raster rejects most of the rest in one vectorized pass, and
+    overlap tests only look at the parts found through a uniform grid index, so
+    the cost per placement stays roughly constant with hundreds of parts on a sheet.
+
+    Example:
+        python3 sheet_metal_conus_nest.py parts.csv --sheet 3000 1500 --gap 5 -o nest
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+from sheet_metal_conus_geometry import (build_cone_path, build_gore_path, calculate_cones, cone_to_dict,
+                                        calculate_gore_count, gore_cone, gore_edges)
+from sheet_metal_conus_cli import (SVG_HEADER, SVG_FOOTER, add_layout_arguments, guess_format, layout_options, line_style,
+                                   open_input, part_name, read_rows)
+
+# number of bisection steps used when sliding a part towards the sheet origin
+SLIDE_STEPS = 10
+# resolution of the occupancy raster of a sheet along its longer side
+RASTER_CELLS = 512
+
+def sector_area(dictCone):
+    " Material area of the unrolled annular sector "
+    return dictCone['angle'] / 2 * (dictCone['longRadius']**2 - dictCone['shortRadius']**2)
+
+def sector_polygon(shortRadius, longRadius, angle, tolerance, seam=0.0, tabs=0):
+    """ Polygon (k x 2 array) enclosing the annular sector with the apex at the origin.
+        The outer arc is approximated by tangent chords and the inner arc by
+        secant chords, so the polygon never is smaller than the real blank.
+        tolerance is the largest distance between polygon and arc.
+        seam and tabs add the seam allowance of a gore (see gore_edges()).
+    """
+    step = min(2 * math.acos(longRadius / (longRadius + tolerance)), math.pi / 4)
+    count = max(1, int(math.ceil(angle / step)))
+    # vertices just outside the arc so every chord touches it
+    outerRadius = longRadius / math.cos(angle / count / 2)
+    outer = np.linspace(0.0, angle, count + 1)
+    first, second = gore_edges(shortRadius, longRadius, angle, seam, tabs)
+    points = [outerRadius * np.column_stack((np.cos(outer), np.sin(outer))),
+              np.array(second[1:-1]).reshape(-1, 2)]
+    if shortRadius > 0:
+        inner = outer[::-1]
+        points.append(shortRadius * np.column_stack((np.cos(inner), np.sin(inner))))
+    else:
+        points.append(np.zeros((1, 2)))
+    points.append(np.array(first[1:-1]).reshape(-1, 2))
+    return np.concatenate(points)
+
+def sector_probes(shortRadius, longRadius, angle):
+    " A few points on the annular sector used for quick overlap rejection "
+    middle = (shortRadius + longRadius) / 2
+    angles = np.array([0.05, 0.25, 0.5, 0.75, 0.95]) * angle
+    return np.concatenate((middle * np.column_stack((np.cos(angles), np.sin(angles))),
+                           longRadius * np.column_stack((np.cos(angles), np.sin(angles)))))
+
+def _rotate(points, degrees):
+    rad = math.radians(degrees)
+    c, s = math.cos(rad), math.sin(rad)
+    return points @ np.array([[c, s], [-s, c]])
+
+def _bbox(points):
+    return (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max())
+
+def _bboxes_overlap(a, b, gap):
+    return a[0] < b[2] + gap and b[0] < a[2] + gap and a[1] < b[3] + gap and b[1] < a[3] + gap
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+def _point_segment_distance(points, starts, ends):
+    " Distances of every point to every segment (len(points) x len(starts)) "
+    edge = ends - starts
+    length = np.maximum((edge * edge).sum(axis=1), 1e-300)
+    diff = points[:, None, :] - starts[None, :, :]
+    t = np.clip((diff * edge[None]).sum(axis=2) / length, 0.0, 1.0)
+    closest = starts[None] + t[..., None] * edge[None]
+    return np.hypot(*(points[:, None, :] - closest).transpose(2, 0, 1))
+
+def _point_in_polygon(point, polygon, ends):
+    x, y = point
+    xi, yi = polygon[:, 0], polygon[:, 1]
+    xj, yj = ends[:, 0], ends[:, 1]
+    with np.errstate(all='ignore'):
+        crossing = ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+    return bool(np.count_nonzero(crossing) % 2)
+
+def _near_edges(starts, ends, bbox, gap):
+    " Mask of the edges whose bounding box comes closer than gap to bbox "
+    return ((np.minimum(starts[:, 0], ends[:, 0]) < bbox[2] + gap) &
+            (np.maximum(starts[:, 0], ends[:, 0]) > bbox[0] - gap) &
+            (np.minimum(starts[:, 1], ends[:, 1]) < bbox[3] + gap) &
+            (np.maximum(starts[:, 1], ends[:, 1]) > bbox[1] - gap))
+
+def _contains(outer, bbox):
+    return outer[0] <= bbox[0] and outer[1] <= bbox[1] and outer[2] >= bbox[2] and outer[3] >= bbox[3]
+
+def _edges_clash(p, pEnds, pBox, q, qEnds, qBox, gap):
+    " polygons_clash() for polygons with precomputed edge ends and bounding boxes "
+    pNear = _near_edges(p, pEnds, qBox, gap)
+    qNear = _near_edges(q, qEnds, pBox, gap)
+    if pNear.any() and qNear.any():
+        p1, p2 = p[pNear], pEnds[pNear]
+        q1, q2 = q[qNear], qEnds[qNear]
+        d = p2 - p1
+        e = q2 - q1
+        o1 = _cross(d[:, None], q1[None] - p1[:, None])
+        o2 = _cross(d[:, None], q2[None] - p1[:, None])
+        o3 = _cross(e[None], p1[:, None] - q1[None])
+        o4 = _cross(e[None], p2[:, None] - q1[None])
+        if np.any((o1 * o2 < 0) & (o3 * o4 < 0)):
+            return True
+        if gap > 0:
+            if _point_segment_distance(p1, q1, q2).min() < gap or _point_segment_distance(q1, p1, p2).min() < gap:
+                return True
+    # without crossing edges the polygons only clash if one lies inside the other
+    return ((_contains(qBox, pBox) and _point_in_polygon(p[0], q, qEnds)) or
+            (_contains(pBox, qBox) and _point_in_polygon(q[0], p, pEnds)))
+
+def polygons_clash(p, q, gap=0.0):
+    """ True if the closed polygons p and q overlap or come closer than gap.
+        Only edges near the other polygon are tested, all of them in one vectorized pass.
+    """
+    return _edges_clash(p, np.roll(p, -1, axis=0), _bbox(p), q, np.roll(q, -1, axis=0), _bbox(q), gap)
+
+class SpatialGrid:
+    """ Uniform grid hash of bounding boxes.
+        query() only returns the items sharing a cell with the given box.
+    """
+    def __init__(self, cell):
+        self.cell = cell
+        self.cells = {}
+
+    def _keys(self, bbox):
+        x0, y0 = int(math.floor(bbox[0] / self.cell)), int(math.floor(bbox[1] / self.cell))
+        x1, y1 = int(math.floor(bbox[2] / self.cell)), int(math.floor(bbox[3] / self.cell))
+        for ix in range(x0, x1 + 1):
+            for iy in range(y0, y1 + 1):
+                yield (ix, iy)
+
+    def insert(self, item, bbox):
+        for key in self._keys(bbox):
+            self.cells.setdefault(key, []).append(item)
+
+    def remove(self, item, bbox):
+        for key in self._keys(bbox):
+            self.cells[key].remove(item)
+
+    def query_point(self, x, y):
+        return self.cells.get((int(math.floor(x / self.cell)), int(math.floor(y / self.cell))), ())
+
+    def query(self, bbox):
+        found = set()
+        for key in self._keys(bbox):
+            found.update(self.cells.get(key, ()))
+        return found
+
+class Sheet:
+    " One stock sheet with the parts placed on it so far "
+    def __init__(self, width, height, margin, gap, cell):
+        self.width = width
+        self.height = height
+        self.margin = margin
+        self.gap = gap
+        self.grid = SpatialGrid(cell)
+        self.polygons = []
+        self.ends = []
+        self.bboxes = []
+        self.placements = []
+        self.sectors = []
+        self.rejected = set()
+        self.area = 0.0
+        # candidate lower left corners next to the placed parts, and the centers of
+        # unused inner radii (point -> inner radius, 0 for corners), indexed by the
+        # grid so the ones a new part covers are found without scanning all of them
+        self.anchors = {}
+        self.anchorGrid = SpatialGrid(cell)
+        self._add_anchor((margin, margin), 0.0)
+        # raster cells lying completely on a placed blank, a probe point on one of
+        # them rejects a candidate position without looking at the parts
+        self.rasterCell = max(width, height) / RASTER_CELLS
+        self.occupied = np.zeros((int(math.ceil(height / self.rasterCell)) + 1,
+                                  int(math.ceil(width / self.rasterCell)) + 1), dtype=bool)
+
+    @property
+    def utilization(self):
+        " Share of the sheet area covered by blanks "
+        return self.area / (self.width * self.height)
+
+    def fits(self, polygon, ends, bbox):
+        " Test a polygon in sheet coordinates against the sheet edges and all nearby parts "
+        if (bbox[0] < self.margin or bbox[1] < self.margin or
+                bbox[2] > self.width - self.margin or bbox[3] > self.height - self.margin):
+            return False
+        search = (bbox[0] - self.gap, bbox[1] - self.gap, bbox[2] + self.gap, bbox[3] + self.gap)
+        for item in self.grid.query(search):
+            if _bboxes_overlap(bbox, self.bboxes[item], self.gap) and \
+                    _edges_clash(polygon, ends, bbox, self.polygons[item], self.ends[item], self.bboxes[item], self.gap):
+                return False
+        return True
+
+    def _on_sector(self, item, x, y):
+        " True if the point (x, y) lies on the placed blank item "
+        px, py, rotation, shortRadius, longRadius, angle = self.sectors[item]
+        dx = x - px
+        dy = y - py
+        dist = math.hypot(dx, dy)
+        return shortRadius <= dist <= longRadius and (math.atan2(dy, dx) - rotation) % (2 * math.pi) <= angle
+
+    def covers(self, x, y):
+        " True if the point (x, y) lies on a placed blank, tested against the exact sectors "
+        for item in self.grid.query_point(x, y):
+            if self._on_sector(item, x, y):
+                return True
+        return False
+
+    def _add_anchor(self, point, hole):
+        if point not in self.anchors and not self.covers(*point):
+            self.anchors[point] = hole
+            self.anchorGrid.insert(point, point + point)
+
+    def fits_shape(self, shape, x, y):
+        " fits() for a rotated shape at (x, y), rejecting most clashes by a few probe points first "
+        for px, py in shape[4]:
+            if self.covers(px + x, py + y):
+                return False
+        return self.fits(*_shape_at(shape, x, y))
+
+    def candidates(self, width, height):
+        """ Lower left corners worth trying for a part with the given (rotated) bounding box size.
+            Only the anchors no placed blank covers yet are left, so this does not
+            grow with the number of parts on a full sheet.
+        """
+        m = self.margin
+        points = set()
+        for (x, y), hole in self.anchors.items():
+            if not hole:
+                points.add((x, y))
+            elif hole > max(width, height) / 2:
+                # the unused inner radius of a larger blank
+                points.add((x - width / 2, y - height / 2))
+        limitX = self.width - m - width
+        limitY = self.height - m - height
+        points = [p for p in points if m <= p[0] <= limitX and m <= p[1] <= limitY]
+        points.sort(key=lambda p: (p[1] + height, p[0]))
+        return points
+
+    def positions(self, shape):
+        """ Positions (x, y) of a rotated shape at the candidate corners, in candidate
+            order, leaving out those where a probe point of the shape lands on the
+            occupancy raster. All candidates are tested in one vectorized pass.
+        """
+        localBox = shape[3]
+        points = self.candidates(localBox[2] - localBox[0], localBox[3] - localBox[1])
+        if not points:
+            return []
+        offsets = np.array(points) - (localBox[0], localBox[1])
+        cells = np.floor((offsets[:, None, :] + np.array(shape[4])[None]) / self.rasterCell).astype(int)
+        rows, columns = self.occupied.shape
+        hit = self.occupied[np.clip(cells[..., 1], 0, rows - 1), np.clip(cells[..., 0], 0, columns - 1)].any(axis=1)
+        return offsets[~hit].tolist()
+
+    def _rasterize(self, item, bbox):
+        """ Mark the raster cells lying completely on the placed blank item: the
+            circle through the corners of a cell has to stay inside the annulus and
+            away from both straight edges of the sector.
+        """
+        px, py, rotation, shortRadius, longRadius, angle = self.sectors[item]
+        size = self.rasterCell
+        half = size * math.sqrt(0.5)
+        rows, columns = self.occupied.shape
+        x0, x1 = max(0, int(bbox[0] // size)), min(columns - 1, int(bbox[2] // size))
+        y0, y1 = max(0, int(bbox[1] // size)), min(rows - 1, int(bbox[3] // size))
+        if x0 > x1 or y0 > y1:
+            return
+        dx, dy = np.meshgrid((np.arange(x0, x1 + 1) + 0.5) * size - px, (np.arange(y0, y1 + 1) + 0.5) * size - py)
+        dist = np.hypot(dx, dy)
+        inside = (dist >= shortRadius + half) & (dist <= longRadius - half)
+        inside &= (np.arctan2(dy, dx) - rotation) % (2 * math.pi) <= angle
+        for edge in (rotation, rotation + angle):
+            ux, uy = math.cos(edge), math.sin(edge)
+            along = np.maximum(dx * ux + dy * uy, 0.0)
+            inside &= np.hypot(dx - along * ux, dy - along * uy) >= half
+        self.occupied[y0:y1 + 1, x0:x1 + 1] |= inside
+
+    def place(self, part, shape, x, y):
+        rotation = shape[0]
+        polygon, ends, bbox = _shape_at(shape, x, y)
+        item = len(self.placements)
+        self.polygons.append(polygon)
+        self.ends.append(ends)
+        self.bboxes.append(bbox)
+        self.grid.insert(item, bbox)
+        self.sectors.append((x, y, math.radians(rotation), part['cone']['shortRadius'],
+                             part['cone']['longRadius'], part['cone']['angle']))
+        self.placements.append({'part': part['index'], 'name': part['name'],
+                                'x': x, 'y': y, 'rotation': rotation,
+                                'shortRadius': part['cone']['shortRadius'],
+                                'angle': part['cone']['angle'],
+                                'cone': part['cone']})
+        self.area += part['area']
+        self._rasterize(item, bbox)
+        # anchors on the new blank are of no use anymore
+        for point in self.anchorGrid.query(bbox):
+            if self._on_sector(item, *point):
+                del self.anchors[point]
+                self.anchorGrid.remove(point, point + point)
+        m, g = self.margin, self.gap
+        x0, y0, x1, y1 = bbox
+        for point in ((x1 + g, y0), (x0, y1 + g), (x1 + g, m), (m, y1 + g)):
+            self._add_anchor(point, 0.0)
+        hole = part['cone']['shortRadius']
+        if hole > 0:
+            bisector = math.radians(rotation) + part['cone']['angle'] / 2
+            for dist in (0.0, hole / 2):
+                self._add_anchor((x + dist * math.cos(bisector), y + dist * math.sin(bisector)), hole)
+
+def _shape_at(shape, x, y):
+    " Polygon, edge ends and bounding box of a rotated shape moved to (x, y) "
+    rotation, local, localEnds, localBox, probes = shape
+    return (local + (x, y), localEnds + (x, y),
+            (localBox[0] + x, localBox[1] + y, localBox[2] + x, localBox[3] + y))
+
+def _slide(sheet, shape, x, y, axis):
+    """ Move a fitting shape at (x, y) towards the sheet origin along axis by bisection.
+        Returns the distance it could be moved.
+    """
+    room = _shape_at(shape, x, y)[2][axis] - sheet.margin
+    if room <= 0:
+        return 0.0
+    def fits(dist):
+        return sheet.fits_shape(shape, x - dist * (1 - axis), y - dist * axis)
+    if fits(room):
+        return room
+    low, high = 0.0, room
+    for _ in range(SLIDE_STEPS):
+        mid = (low + high) / 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid
+    return low
+
+def _place_on_sheet(sheet, part):
+    " Best (score, shape, x, y) of part on sheet, or None "
+    if part['key'] in sheet.rejected:
+        return None
+    best = None
+    for shape in part['shapes']:
+        localBox = shape[3]
+        for x, y in sheet.positions(shape):
+            if not sheet.fits_shape(shape, x, y):
+                continue
+            for _ in range(2):
+                y -= _slide(sheet, shape, x, y, 1)
+                x -= _slide(sheet, shape, x, y, 0)
+            score = (y + localBox[3], x + localBox[2])
+            if best is None or score < best[0]:
+                best = (score, shape, x, y)
+            break
+    if best is None:
+        # the sheet only gets fuller, identical blanks will not fit either
+        sheet.rejected.add(part['key'])
+    return best
+
+def nest_cones(cones, sheetWidth, sheetHeight, gap=0.0, margin=0.0, rotations=4, tolerance=None):
+    """ Place the unrolled blanks of all cones on as few sheets as possible.
+        cones is a list of dictionaries as filled in by calculate_cone(), an
+        optional 'name' key is copied to the placements.
+        Every blank may be turned by multiples of 360/rotations degrees.
+        Returns (sheets, unplaced) where sheets is a list of Sheet objects
+        and unplaced the indices of blanks that are larger than a sheet.
+    """
+    if tolerance is None:
+        tolerance = max(gap / 4, 1e-3 * max(sheetWidth, sheetHeight))
+    parts = []
+    shapes = {}
+    for index, dictCone in enumerate(cones):
+        seam = dictCone.get('seam', 0.0)
+        tabs = dictCone.get('tabs', 0)
+        key = (dictCone['shortRadius'], dictCone['longRadius'], dictCone['angle'], seam, tabs)
+        if key not in shapes:
+            polygon = sector_polygon(dictCone['shortRadius'], dictCone['longRadius'], dictCone['angle'], tolerance, seam, tabs)
+            probes = sector_probes(dictCone['shortRadius'], dictCone['longRadius'], dictCone['angle'])
+            # rotations are counted from the one that points the bisector downwards
+            start = -90.0 - math.degrees(dictCone['angle']) / 2
+            shapes[key] = []
+            for k in range(max(1, rotations)):
+                rotation = (start + k * 360.0 / max(1, rotations)) % 360.0
+                local = _rotate(polygon, rotation)
+                shapes[key].append((rotation, local, np.roll(local, -1, axis=0), _bbox(local),
+                                    [tuple(p) for p in _rotate(probes, rotation)]))
+        parts.append({'index': index, 'name': dictCone.get('name', str(index)), 'key': key,
+                      'cone': dictCone, 'area': sector_area(dictCone), 'shapes': shapes[key]})
+    # large blanks first, so the small ones can fill their holes
+    parts.sort(key=lambda part: -part['area'])
+    cell = max(1e-9, float(np.median([part['cone']['longRadius'] for part in parts]))) if parts else 1.0
+
+    sheets = []
+    unplaced = []
+    for part in parts:
+        for sheet in sheets:
+            best = _place_on_sheet(sheet, part)
+            if best:
+                break
+        else:
+            sheet = Sheet(sheetWidth, sheetHeight, margin, gap, cell)
+            best = _place_on_sheet(sheet, part)
+            if best is None:
+                unplaced.append(part['index'])
+                continue
+            sheets.append(sheet)
+        score, shape, x, y = best
+        sheet.place(part, shape, x, y)
+    return sheets, sorted(unplaced)
+
+def placement_path(dictCone, tolerance=None, precision=None):
+    """ Outline of a placed blank, a whole layout or a gore with its seam allowance.
+        With a tolerance the arcs are flattened into polylines, with a precision
+        the path is written compact.
+    """
+    if 'gores' in dictCone:
+        return build_gore_path(dictCone, 1.0, dictCone.get('seam', 0.0), dictCone.get('tabs', 0), tolerance, precision)
+    return build_cone_path(dictCone, 1.0, tolerance, precision)
+
+def split_into_gores(dictCone, sheetWidth, sheetHeight, seam=0.0, tabs=0):
+    """ Returns [dictCone] if the layout fits the sheet, otherwise the list of the
+        smallest number of gores that do (each with its seam allowance).
+        Layouts that can not be split are returned unchanged.
+    """
+    count = calculate_gore_count(dictCone, sheetWidth, sheetHeight, seam, tabs)
+    if count is None or (count == 1 and seam <= 0):
+        return [dictCone]
+    gores = []
+    for index in range(count):
+        gore = gore_cone(dictCone, count)
+        gore['seam'] = seam
+        gore['tabs'] = tabs
+        if 'name' in dictCone:
+            gore['name'] = '%s_gore%d' % (dictCone['name'], index + 1)
+        gores.append(gore)
+    return gores
+
+def render_sheet_svg(sheet, options):
+    " SVG document of one sheet with all placed blanks, coordinates in units "
+    units = options['units']
+    size = ' width="%s%s" height="%s%s" viewBox="0 0 %s %s"' % (sheet.width, units, sheet.height, units, sheet.width, sheet.height)
+    style = line_style(options)
+    out = [SVG_HEADER % size,
+           '<rect inkscape:label="Sheet" x="0" y="0" width="%s" height="%s" style="fill:none;stroke:#c0c0c0;stroke-width:%s"/>\n'
+           % (sheet.width, sheet.height, options['strokeWidth'])]
+    for placement in sheet.placements:
+        out.append('<g inkscape:label="%s" transform="translate(%s,%s) rotate(%s)">'
+                   '<path style="%s" inkscape:label="Cone" d="%s"/></g>\n'
+                   % (placement['name'], placement['x'], placement['y'], placement['rotation'],
+                      style, placement_path(placement['cone'], options.get('tolerance'), options.get('precision'))))
+    out.append(SVG_FOOTER)
+    return ''.join(out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Nest the cutting layouts of many cones onto stock sheets.')
+    parser.add_argument('input', help='CSV or JSONL file with the columns diaBase, diaCut, heightCone and optionally name and quantity ("-" for stdin).')
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'), help='Format of the input, guessed from the file extension if omitted.')
+    parser.add_argument('-s', '--sheet', nargs=2, type=float, metavar=('WIDTH', 'HEIGHT'), required=True, help='Size of the stock sheets in units.')
+    parser.add_argument('-g', '--gap', type=float, default=0.0, help='Minimum distance between two blanks in units.')
+    parser.add_argument('-m', '--margin', type=float, default=0.0, help='Unused border of the sheets in units.')
+    parser.add_argument('-r', '--rotations', type=int, default=4, help='Number of evenly spaced rotations tried for every blank.')
+    parser.add_argument('--gores', action='store_true', help='Split blanks that are larger than a sheet into the smallest number of equal gores.')
+    parser.add_argument('--seam', type=float, default=0.0, help='Seam allowance added to the radial edges of every gore in units.')
+    parser.add_argument('--tabs', type=int, default=0, help='Number of joggle tabs per gore seam instead of a continuous allowance.')
+    parser.add_argument('-o', '--outdir', default='.', help='Directory for the sheet files.')
+    add_layout_arguments(parser)
+    args = parser.parse_args(argv)
+
+    fmt = args.input_format or guess_format(args.input)
+    with open_input(args.input) as infile:
+        rows = list(read_rows(infile, fmt))
+
+    def number(row, key, default=None):
+        try:
+            return float(row.get(key) or default)
+        except (TypeError, ValueError):
+            return math.nan
+    solved = calculate_cones([number(row, 'diaBase') for row in rows],
+                             [number(row, 'diaCut', 0.0) for row in rows],
+                             [number(row, 'heightCone') for row in rows])
+    cones = []
+    failed = False
+    for index, (row, cone, invalid) in enumerate(zip(rows, solved, solved.mask['angle'])):
+        name = part_name(index, row)
+        if invalid:
+            failed = True
+            sys.stderr.write('Skipping row %d (%s): cone can not be unrolled.\n' % (index + 1, name))
+            continue
+        dictCone = cone_to_dict(cone)
+        quantity = number(row, 'quantity', 1)
+        quantity = int(quantity) if quantity >= 1 else 1
+        for copy in range(quantity):
+            part = dict(dictCone)
+            part['name'] = name if quantity == 1 else '%s_%d' % (name, copy + 1)
+            if args.gores:
+                cones += split_into_gores(part, args.sheet[0] - 2*args.margin, args.sheet[1] - 2*args.margin, args.seam, args.tabs)
+            else:
+                cones.append(part)
+
+    sheets, unplaced = nest_cones(cones, args.sheet[0], args.sheet[1], args.gap, args.margin, args.rotations)
+    options = layout_options(args)
+    os.makedirs(args.outdir, exist_ok=True)
+    total = 0.0
+    for count, sheet in enumerate(sheets, 1):
+        filename = os.path.join(args.outdir, 'sheet_%03d.svg' % count)
+        with open(filename, 'w', newline='\n') as f:
+            f.write(render_sheet_svg(sheet, options))
+        total += sheet.area
+        print('%s: %d parts, utilization %.1f %%' % (filename, len(sheet.placements), 100 * sheet.utilization))
+    if sheets:
+        print('Total: %d parts on %d sheets, utilization %.1f %%'
+              % (len(cones) - len(unplaced), len(sheets), 100 * total / (len(sheets) * args.sheet[0] * args.sheet[1])))
+    for index in unplaced:
+        failed = True
+        sys.stderr.write('%s does not fit onto a sheet.\n' % cones[index]['name'])
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
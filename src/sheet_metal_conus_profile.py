@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Distributed under the terms of the GNU Lesser General Public License v3.0
+
+""" Opt-in per phase instrumentation.
+
+    A Profiler records wall time and allocations of named phases:
+
+        profiler = Profiler(enabled=True)
+        with profiler.phase('solve'):
+            calculate_cone(dictCone)
+        report = profiler.report()
+
+    Phases can be nested, a nested phase is recorded under 'outer/inner', and
+    a phase that is entered several times accumulates its calls. For every
+    phase the report holds the number of calls, the wall time in seconds and,
+    traced with tracemalloc while the profiler is running, the peak number of
+    bytes allocated on top of what was allocated when the phase was entered
+    (the largest of all calls) as well as the net change of allocated memory
+    blocks and bytes once the phase is left. The net changes leave out what
+    was freed again, so they can be zero or negative for phases that allocate
+    a lot of temporary memory; the peak shows those.
+    A disabled profiler hands out one shared no-op context manager, so
+    instrumented code costs next to nothing when profiling is off.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+_NO_PHASE = nullcontext()
+
+class _Phase:
+    """ Context manager measuring one entry of a phase. The tracemalloc peak is
+        reset on entry, the peak seen so far is handed to the enclosing phase
+        (or the profiler) first, so the peaks of all levels stay correct.
+    """
+    __slots__ = ('profiler', 'name', 'parent', 'start', 'blocks', 'bytes', 'peak')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        profiler = self.profiler
+        stack = profiler.stack
+        stack.append(stack[-1] + '/' + self.name if stack else self.name)
+        self.parent = profiler.active[-1] if profiler.active else profiler
+        profiler.active.append(self)
+        self.blocks = sys.getallocatedblocks()
+        self.bytes, peak = tracemalloc.get_traced_memory()
+        self.parent.peak = max(self.parent.peak, peak)
+        tracemalloc.reset_peak()
+        self.peak = self.bytes
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak)
+        self.parent.peak = max(self.parent.peak, self.peak)
+        self.profiler.active.pop()
+        record = self.profiler.phases.setdefault(self.profiler.stack.pop(),
+                                                 {'calls': 0, 'seconds': 0.0, 'peakBytes': 0, 'netBlocks': 0, 'netBytes': 0})
+        record['calls'] += 1
+        record['seconds'] += seconds
+        record['peakBytes'] = max(record['peakBytes'], self.peak - self.bytes)
+        record['netBlocks'] += sys.getallocatedblocks() - self.blocks
+        record['netBytes'] += current - self.bytes
+
+class Profiler:
+    " Collects timing and allocation records of named phases, does nothing unless enabled "
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = {}
+        self.stack = []
+        self.active = []
+        # highest traced memory before the latest reset of the tracemalloc peak
+        self.peak = 0
+        self.startedTracing = False
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.startedTracing = True
+
+    def phase(self, name):
+        " Context manager recording the enclosed code as phase name "
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def report(self, **info):
+        " JSON compatible dictionary of all phases recorded so far, info is added as is "
+        result = dict(info)
+        result['phases'] = {name: dict(record) for name, record in self.phases.items()}
+        if self.enabled and tracemalloc.is_tracing():
+            result['peakBytes'] = max(self.peak, tracemalloc.get_traced_memory()[1])
+        return result
+
+    def stop(self):
+        " Stop tracing allocations if this profiler started it "
+        if self.startedTracing:
+            tracemalloc.stop()
+            self.startedTracing = False
+
+def write_report(filename, report):
+    " Append the report as one JSON line, so reports of many runs can be collected in one file "
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, sort_keys=True, separators=(',', ':')) + '\n')
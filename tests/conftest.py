@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the extension modules are plain files in src, as they are installed into the Inkscape extensions folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,53 @@
+""" Updating a cone group drawn by an earlier run of the effect in place """
+
+import io
+
+import pytest
+from lxml import etree
+
+inkex = pytest.importorskip('inkex')
+from sheet_metal_conus import SheetMetalConus
+
+BLANK = b'''<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+    xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd" width="297mm" height="210mm" viewBox="0 0 297 210">
+  <sodipodi:namedview id="namedview"/>
+  <g id="layer1" inkscape:label="Layer 1" inkscape:groupmode="layer"/>
+</svg>'''
+
+VERBOSE = ['--verbose=true', '--bendLines=8', '--bendNumbers=true']
+
+def run_effect(args, document, tmp_path):
+    source = tmp_path / 'input.svg'
+    source.write_bytes(document)
+    out = io.BytesIO()
+    SheetMetalConus().run(args + [str(source)], output=out)
+    return etree.fromstring(out.getvalue())
+
+def cone_group(root):
+    return next(node for node in root.iter() if node.get(SheetMetalConus.paramsAttribute) is not None)
+
+def drawn_with_ids(tmp_path):
+    " Document with a verbose cone group whose nodes all got ids, like Inkscape gives them "
+    root = run_effect(VERBOSE, BLANK, tmp_path)
+    for number, node in enumerate(cone_group(root).iter()):
+        if node.get('id') is None:
+            node.set('id', 'node%d' % number)
+    return root
+
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+@pytest.mark.parametrize('change', ['--strokeWidth=0.5', '--diaBase=120', '--heightCone=80'])
+def test_update_keeps_ids(tmp_path, change):
+    root = drawn_with_ids(tmp_path)
+    grp = cone_group(root)
+    ids = [node.get('id') for node in grp.iter()]
+    updated = cone_group(run_effect(VERBOSE + [change, '--id=' + grp.get('id')], etree.tostring(root), tmp_path))
+    assert [node.get('id') for node in updated.iter()] == ids
+
+@pytest.mark.filterwarnings('ignore::DeprecationWarning')
+def test_update_matches_fresh_drawing(tmp_path):
+    root = drawn_with_ids(tmp_path)
+    grp = cone_group(root)
+    updated = cone_group(run_effect(VERBOSE + ['--diaBase=120', '--id=' + grp.get('id')], etree.tostring(root), tmp_path))
+    fresh = cone_group(run_effect(VERBOSE + ['--diaBase=120'], BLANK, tmp_path))
+    strip = lambda node: [(child.tag, {k: v for k, v in child.attrib.items() if k != 'id'}, child.text) for child in node.iter()]
+    assert strip(updated)[1:] == strip(fresh)[1:]
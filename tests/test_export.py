@@ -0,0 +1,47 @@
+""" DXF and G-code output is written straight from the geometry and byte stable """
+
+import io
+
+import pytest
+
+from sheet_metal_conus_export import DxfWriter, GcodeWriter
+from sheet_metal_conus_geometry import calculate_cone
+
+# radii of 130 and 260, so the expected numbers are exact
+EXPECTED_DXF = ('0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n0\nENDSEC\n0\nSECTION\n2\nENTITIES\n'
+                '0\nLINE\n8\n0\n10\n130.000000\n20\n0.000000\n11\n260.000000\n21\n0.000000\n'
+                '0\nARC\n8\n0\n10\n0.000000\n20\n0.000000\n40\n260.000000\n50\n221.538462\n51\n0.000000\n'
+                '0\nLINE\n8\n0\n10\n-194.612795\n20\n-172.411891\n11\n-97.306397\n21\n-86.205946\n'
+                '0\nARC\n8\n0\n10\n0.000000\n20\n0.000000\n40\n130.000000\n50\n221.538462\n51\n0.000000\n'
+                '0\nENDSEC\n0\nEOF\n')
+
+EXPECTED_GCODE = ('(Sheet Metal Conus)\nG21\nG90\nG17\nF1000.0000\n(part)\n'
+                  'G0 X130.0000 Y0.0000\nM3\nG1 X260.0000 Y0.0000\n'
+                  'G2 X-194.6128 Y-172.4119 I-260.0000 J0.0000\nG1 X-97.3064 Y-86.2059\n'
+                  'G3 X130.0000 Y0.0000 I97.3064 J86.2059\nM5\nM2\n')
+
+def solved(diaBase, diaCut, heightCone):
+    dictCone = {'diaBase': diaBase, 'diaCut': diaCut, 'heightCone': heightCone}
+    calculate_cone(dictCone)
+    return dictCone
+
+def written(writer, cones, **options):
+    stream = io.StringIO()
+    with writer(stream, 'mm', **options) as output:
+        for index, dictCone in enumerate(cones):
+            output.write_cone(dictCone, dx=index * 700.0, name='part')
+    return stream.getvalue()
+
+@pytest.mark.parametrize('writer, expected', [(DxfWriter, EXPECTED_DXF), (GcodeWriter, EXPECTED_GCODE)])
+def test_output_is_pinned(writer, expected):
+    assert written(writer, [solved(200.0, 100.0, 120.0)]) == expected
+
+@pytest.mark.parametrize('writer', [DxfWriter, GcodeWriter])
+@pytest.mark.parametrize('tolerance', [None, 0.05])
+def test_output_is_byte_stable(writer, tolerance):
+    cones = [solved(200.0, 100.0, 120.0), solved(100.0, 0.0, 50.0), solved(1200.0, 350.0, 80.0)]
+    first = written(writer, cones, tolerance=tolerance)
+    # solved again from scratch, in another order of calls
+    again = [solved(*values) for values in ((200.0, 100.0, 120.0), (100.0, 0.0, 50.0), (1200.0, 350.0, 80.0))]
+    assert written(writer, again, tolerance=tolerance) == first
+    assert '-0.0000' not in first
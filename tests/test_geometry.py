@@ -0,0 +1,98 @@
+""" Invariants of the cone geometry shared by the effect and the command line tools """
+
+import re
+
+import pytest
+
+from sheet_metal_conus_geometry import (CONE_FIELDS, UNIT_TOLERANCE, build_cone_path, build_gore_path, calculate_cone,
+                                        calculate_cones, calculate_gore_count, cone_outline, cone_to_dict, gore_cone,
+                                        gore_fits, gore_outline, path_precision)
+
+# (diaBase, diaCut, heightCone), including a pointed cone and nearly flat ones
+CONES = [(100.0, 0.0, 50.0), (200.0, 100.0, 120.0), (1200.0, 350.0, 80.0), (50.0, 49.5, 300.0),
+         (3000.0, 10.0, 5.0), (75.25, 12.5, 0.75)]
+
+def solved(diaBase, diaCut, heightCone):
+    dictCone = {'diaBase': diaBase, 'diaCut': diaCut, 'heightCone': heightCone}
+    calculate_cone(dictCone)
+    return dictCone
+
+def test_calculate_cones_matches_calculate_cone():
+    pytest.importorskip('numpy')
+    bases, cuts, heights = zip(*CONES)
+    cones = calculate_cones(bases, cuts, heights)
+    names = [field[0] for field in CONE_FIELDS]
+    for row, values in zip(cones, CONES):
+        dictCone = solved(*values)
+        # bit for bit, not approximately
+        assert cone_to_dict(row) == {name: dictCone[name] for name in names}
+
+def test_calculate_cones_masks_invalid_rows():
+    pytest.importorskip('numpy')
+    cones = calculate_cones([100.0, 100.0, 100.0, float('nan'), 100.0], [100.0, 120.0, 10.0, 10.0, -1.0],
+                            [50.0, 50.0, 0.0, 50.0, 50.0])
+    assert cones.mask['longRadius'].all()
+
+@pytest.mark.parametrize('values', CONES)
+@pytest.mark.parametrize('sheet', [(1000.0, 500.0), (3000.0, 1500.0), (250.0, 2500.0)])
+@pytest.mark.parametrize('seam, tabs', [(0.0, 0), (8.0, 0), (5.0, 3)])
+def test_gore_count_matches_brute_force(values, sheet, seam, tabs):
+    dictCone = solved(*values)
+    expected = next((count for count in range(1, 257) if gore_fits(gore_cone(dictCone, count), *sheet, seam, tabs)),
+                    None)
+    assert calculate_gore_count(dictCone, *sheet, seam, tabs, maxCount=256) == expected
+
+def path_points(path):
+    " Absolute end points of the commands of a compact relative path, without the closing z "
+    tokens = re.findall(r'[MmLlHhVvAaZz]|-?\d+(?:\.\d+)?', path)
+    arity = {'m': 2, 'l': 2, 'h': 1, 'v': 1, 'a': 7, 'z': 0}
+    points = []
+    x = y = 0.0
+    command = None
+    index = 0
+    while index < len(tokens):
+        if tokens[index].isalpha():
+            command = tokens[index]
+            index += 1
+            if command in 'zZ':
+                continue
+        values = [float(token) for token in tokens[index:index + arity[command.lower()]]]
+        index += len(values)
+        if command == 'M':
+            x, y = values
+        elif command in 'ml':
+            x, y = x + values[0], y + values[1]
+        elif command == 'h':
+            x += values[0]
+        elif command == 'v':
+            y += values[0]
+        else:
+            x, y = x + values[5], y + values[6]
+        points.append((x, y))
+    return points
+
+def assert_within_tolerance(path, outline, convFactor, units):
+    start, segments = outline
+    exact = [start] + [segment[-1] for segment in segments]
+    points = path_points(path)
+    assert len(points) == len(exact)
+    for point, (ex, ey) in zip(points, exact):
+        # rounding is done per coordinate, so each of them is within the tolerance
+        assert abs(point[0] / convFactor - ex) <= UNIT_TOLERANCE[units] + 1e-12
+        assert abs(point[1] / convFactor - ey) <= UNIT_TOLERANCE[units] + 1e-12
+
+@pytest.mark.parametrize('values', CONES)
+@pytest.mark.parametrize('units, convFactor', [('mm', 96.0/25.4), ('cm', 96.0/2.54), ('in', 96.0), ('px', 1.0), ('pt', 4.0/3.0)])
+def test_compact_cone_path_within_unit_tolerance(values, units, convFactor):
+    dictCone = solved(*values)
+    precision = path_precision(units, convFactor)
+    assert_within_tolerance(build_cone_path(dictCone, convFactor, precision=precision),
+                            cone_outline(dictCone), convFactor, units)
+
+@pytest.mark.parametrize('values', CONES)
+def test_compact_gore_path_within_unit_tolerance(values):
+    convFactor = 96.0/25.4
+    gore = gore_cone(solved(*values), 3)
+    precision = path_precision('mm', convFactor)
+    assert_within_tolerance(build_gore_path(gore, convFactor, seam=4.0, tabs=2, precision=precision),
+                            gore_outline(gore, seam=4.0, tabs=2), convFactor, 'mm')
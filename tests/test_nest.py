@@ -0,0 +1,42 @@
+""" Blanks nested onto sheets never overlap and keep the gap and margin """
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from sheet_metal_conus_geometry import calculate_cone
+from sheet_metal_conus_nest import nest_cones, polygons_clash
+
+def random_cones(count, seed):
+    generator = random.Random(seed)
+    cones = []
+    for index in range(count):
+        diaBase = generator.uniform(80.0, 600.0)
+        dictCone = {'diaBase': diaBase, 'diaCut': generator.choice([0.0, generator.uniform(0.1, 0.8) * diaBase]),
+                    'heightCone': generator.uniform(20.0, 400.0), 'name': 'cone%d' % index}
+        calculate_cone(dictCone)
+        cones.append(dictCone)
+    return cones
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+@pytest.mark.parametrize('gap, margin', [(0.0, 0.0), (5.0, 10.0)])
+def test_nest_has_no_overlaps(seed, gap, margin):
+    width, height = 3000.0, 1500.0
+    cones = random_cones(60, seed)
+    sheets, unplaced = nest_cones(cones, width, height, gap=gap, margin=margin)
+    assert sum(len(sheet.placements) for sheet in sheets) + len(unplaced) == len(cones)
+    for sheet in sheets:
+        for index, polygon in enumerate(sheet.polygons):
+            assert polygon[:, 0].min() >= margin - 1e-9 and polygon[:, 0].max() <= width - margin + 1e-9
+            assert polygon[:, 1].min() >= margin - 1e-9 and polygon[:, 1].max() <= height - margin + 1e-9
+            for other in sheet.polygons[:index]:
+                # a hair less than the gap, placements touching at exactly the gap are fine
+                assert not polygons_clash(polygon, other, gap * (1 - 1e-9))
+
+def test_nest_is_deterministic():
+    cones = random_cones(40, 7)
+    first, _ = nest_cones(cones, 2000.0, 1000.0, gap=5.0, margin=10.0)
+    again, _ = nest_cones(random_cones(40, 7), 2000.0, 1000.0, gap=5.0, margin=10.0)
+    assert [[(p['name'], p['x'], p['y'], p['rotation']) for p in sheet.placements] for sheet in first] == \
+           [[(p['name'], p['x'], p['y'], p['rotation']) for p in sheet.placements] for sheet in again]